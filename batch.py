@@ -0,0 +1,239 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from utils.documents import iter_resume_files, extract_texts, resume_extensions
+from utils.ner import MODEL_PATH
+from utils.records import entities_to_record
+from utils.result_cache import ResumeResultCache, sha256_file
+from utils.tables import TABLE_COLUMNS, TableBuilder, concat_frames
+
+
+CHECKPOINT_FILE = 'checkpoint.json'
+
+# Table directories a run writes under output_dir
+OUTPUT_TABLES = list(TABLE_COLUMNS) + ['sources']
+
+
+def resume_paths(inputs, include_txt=False):
+    """Sorted resume paths from directories and glob patterns, .txt files only with include_txt"""
+    extensions = resume_extensions(include_txt)
+    paths = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            paths.update(iter_resume_files(pattern, extensions))
+        else:
+            paths.update(path for path in glob.glob(pattern, recursive=True)
+                         if path.lower().endswith(extensions) and os.path.isfile(path))
+    return sorted(paths)
+
+
+def paths_digest(paths):
+    """sha256 of the path list, a checkpoint only applies to the same list of files"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.encode('utf-8') + b'\n')
+    return digest.hexdigest()
+
+
+class BatchRun:
+
+    """
+
+    Directory/glob of resumes -> text extraction (process pool) -> NER -> normalized tables,
+    written as Arrow IPC parts under output_dir/<table>/part-NNNNN.arrow, one part per chunk.
+
+    After every chunk the run state is written to output_dir/checkpoint.json, so an interrupted
+    run over the same files continues with the first unfinished chunk.
+
+    With a cache_path, extracted texts and entities are kept in a ResumeResultCache, so files
+    seen by an earlier run (or by service.py with the same cache) skip extraction and NER.
+
+    """
+
+    def __init__(self, paths, output_dir, n_workers=None, chunk_size=1000, model_path=MODEL_PATH,
+                 ner_processes=1, max_chars=2000, cache_path=None):
+        self.paths = paths
+        self.output_dir = output_dir
+        self.n_workers = n_workers
+        self.chunk_size = chunk_size
+        self.model_path = model_path
+        self.ner_processes = ner_processes
+        self.max_chars = max_chars
+        self.cache_path = cache_path
+        self.extractor = None
+
+    def checkpoint_path(self):
+        return os.path.join(self.output_dir, CHECKPOINT_FILE)
+
+    def read_checkpoint(self):
+        """Saved state if it belongs to this list of files and chunk size, else a fresh one"""
+        state = {'paths_sha256': paths_digest(self.paths), 'chunk_size': self.chunk_size,
+                 'chunks_done': 0, 'records': 0, 'experiences': 0, 'failed': [], 'term_ids': {}}
+        try:
+            with open(self.checkpoint_path(), 'r', encoding='utf-8') as file:
+                saved = json.load(file)
+        except FileNotFoundError:
+            return state
+        if saved.get('paths_sha256') != state['paths_sha256'] or saved.get('chunk_size') != self.chunk_size:
+            print(f"Checkpoint in {self.output_dir} is for other files, starting over")
+            return state
+        return saved
+
+    def check_output_dir(self):
+        """Refuse to write into a ResumeTables cache, its parts use the same layout"""
+        manifests = glob.glob(os.path.join(self.output_dir, 'manifest.json'))
+        manifests += glob.glob(os.path.join(self.output_dir, '*', 'manifest.json'))
+        if manifests:
+            raise ValueError(f"{self.output_dir} holds a table cache ({manifests[0]}), use another output directory")
+
+    def clear_parts(self):
+        """Remove the Arrow parts of an earlier run, so a fresh run doesn't mix with them"""
+        for table in OUTPUT_TABLES:
+            table_dir = os.path.join(self.output_dir, table)
+            for path in glob.glob(os.path.join(table_dir, 'part-*.arrow')):
+                os.remove(path)
+            if os.path.isdir(table_dir) and not os.listdir(table_dir):
+                os.rmdir(table_dir)
+
+    def write_checkpoint(self, state):
+        tmp_path = self.checkpoint_path() + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(state, file)
+        os.replace(tmp_path, self.checkpoint_path())
+
+    def write_chunk(self, chunk, frames):
+        """One Arrow part per non-empty table, named by chunk so a rerun overwrites it"""
+        # pyarrow is only needed for the output
+        from utils.table_cache import dataframe_to_arrow, write_arrow_file
+        for table, df in frames.items():
+            table_dir = os.path.join(self.output_dir, table)
+            path = os.path.join(table_dir, f"part-{chunk:05d}.arrow")
+            if df.empty:
+                # A rerun of the chunk may have left a part from before
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            os.makedirs(table_dir, exist_ok=True)
+            write_arrow_file(dataframe_to_arrow(df), path + '.tmp')
+            os.replace(path + '.tmp', path)
+
+    def get_extractor(self):
+        if self.extractor is None:
+            from utils.ner import ResumeEntityExtractor
+            self.extractor = ResumeEntityExtractor(self.model_path, n_process=self.ner_processes)
+        return self.extractor
+
+    def chunk_texts(self, paths, n_workers, pool, cache=None):
+        """{path: text} of a chunk, None for files that failed, extracting only what cache lacks"""
+        texts = {}
+        file_hashes = {}
+        if cache is not None:
+            for path in paths:
+                try:
+                    file_hashes[path] = sha256_file(path)
+                except OSError:
+                    # Left to the extraction, which reports the failure
+                    continue
+                texts[path] = cache.cached_file_text(file_hashes[path])
+        for path, text in extract_texts([path for path in paths if texts.get(path) is None], n_workers, pool=pool):
+            texts[path] = text
+            if text and path in file_hashes:
+                cache.add_file_text(file_hashes[path], text)
+        return texts
+
+    def entities(self, texts, cache=None):
+        """extract_chunked entities of texts, only running the texts cache lacks through NER"""
+        def extract(misses):
+            return self.get_extractor().extract_chunked(misses, max_chars=self.max_chars)
+
+        if cache is None:
+            return list(extract(texts))
+        return cache.entities(texts, extract=extract)
+
+    def run(self):
+        self.check_output_dir()
+        os.makedirs(self.output_dir, exist_ok=True)
+        state = self.read_checkpoint()
+        n_chunks = (len(self.paths) + self.chunk_size - 1) // self.chunk_size
+        if state['chunks_done']:
+            print(f"Resuming after chunk {state['chunks_done']} of {n_chunks} ({state['records']} resumes done)")
+        else:
+            self.clear_parts()
+        builder = TableBuilder(state['records'], state['experiences'], state['term_ids'])
+
+        cache = None
+        if self.cache_path:
+            cache = ResumeResultCache(self.cache_path, self.model_path, variant=f"chunked-{self.max_chars}")
+
+        # One extraction pool for the whole run
+        n_workers = self.n_workers or os.cpu_count() or 1
+        try:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                for chunk in range(state['chunks_done'], n_chunks):
+                    chunk_paths = self.paths[chunk * self.chunk_size:(chunk + 1) * self.chunk_size]
+                    texts = self.chunk_texts(chunk_paths, n_workers, pool, cache)
+
+                    # Keep the input order so candidate_ids are the same on every run
+                    parsed = [(path, texts[path]) for path in chunk_paths if texts.get(path)]
+                    failed = [path for path in chunk_paths if not texts.get(path)]
+                    entities = self.entities([text for _, text in parsed], cache)
+                    records = [entities_to_record(item) for item in entities]
+
+                    first_id = builder.record_count
+                    for record in records:
+                        builder.add_record(record)
+                    frames = builder.frames()
+                    frames['sources'] = pd.DataFrame({
+                        'candidate_id': range(first_id, builder.record_count),
+                        'path': [path for path, _ in parsed]
+                    })
+                    self.write_chunk(chunk, frames)
+
+                    state.update(chunks_done=chunk + 1, records=builder.record_count,
+                                 experiences=builder.experience_count, term_ids=builder.term_ids)
+                    state['failed'].extend(failed)
+                    self.write_checkpoint(state)
+                    print(f"Chunk {chunk + 1}/{n_chunks}: {len(records)} resumes, {len(failed)} failed")
+        finally:
+            if cache is not None:
+                cache.close()
+
+        print(f"Done: {state['records']} resumes in {self.output_dir}, {len(state['failed'])} failed")
+        return state
+
+
+def read_output(output_dir):
+    """The tables of a batch run as DataFrames"""
+    from utils.table_cache import read_arrow_file
+    tables = {}
+    for table in OUTPUT_TABLES:
+        table_dir = os.path.join(output_dir, table)
+        if not os.path.isdir(table_dir):
+            continue
+        parts = sorted(name for name in os.listdir(table_dir) if name.endswith('.arrow'))
+        tables[table] = concat_frames([read_arrow_file(os.path.join(table_dir, name)).to_pandas() for name in parts])
+    return tables
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parse a directory or glob of resumes into normalized tables')
+    parser.add_argument('inputs', nargs='+', help="directories or glob patterns, e.g. data/ or 'resumes/**/*.pdf'")
+    parser.add_argument('-o', '--output', required=True, help='output directory for the Arrow tables and checkpoint')
+    parser.add_argument('--workers', type=int, default=None, help='text extraction processes (default: all cores)')
+    parser.add_argument('--ner-processes', type=int, default=1)
+    parser.add_argument('--chunk-size', type=int, default=1000, help='files per output part and checkpoint')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--include-txt', action='store_true', help='also parse .txt files as resumes')
+    parser.add_argument('--cache', default=None, help='SQLite file caching extracted texts and entities')
+    args = parser.parse_args()
+
+    paths = resume_paths(args.inputs, args.include_txt)
+    print(f"{len(paths)} resume files")
+    BatchRun(paths, args.output, n_workers=args.workers, chunk_size=args.chunk_size, model_path=args.model,
+             ner_processes=args.ner_processes, cache_path=args.cache).run()
@@ -1,49 +1,466 @@
-import spacy
+import math
+import multiprocessing
+import os
 import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from utils.ner import model_labels
 
-# Load Blank Model
-nlp = spacy.blank('en')
-
-def train_model(train_data):
-    # Add NER pipeline if it doesn't exist
-    if 'ner' not in nlp.pipe_names:
-        # Use the string name instead of create_pipe
-        nlp.add_pipe('ner', last=True)
-    
-    # Get the NER component
-    ner = nlp.get_pipe('ner')
-    
-    # Add labels in the NLP pipeline
-    for _, annotation in train_data:
-        for ent in annotation.get('entities'):
-            ner.add_label(ent[2])
-    
-    # Remove other pipelines if they are there
-    other_pipes = [pipe for pipe in nlp.pipe_names if pipe != 'ner']
-    with nlp.disable_pipes(*other_pipes):  # only train NER
-        # Initialize the model
-        nlp.initialize()
-        
-        for itn in range(10):  # train for 10 iterations
-            print("Starting iteration " + str(itn))
-            random.shuffle(train_data)
+def batch_sizes(batch_size=1, compound=None):
+    """
+    Batch size schedule for minibatch.
+
+    compound is an optional (start, stop, factor) tuple, e.g. (4.0, 32.0, 1.001),
+    that grows the batch size from start to stop. Otherwise batch_size is used
+    for every batch.
+    """
+    if compound is not None:
+        from spacy.util import compounding
+        start, stop, factor = compound
+        return compounding(start, stop, factor)
+    return batch_size
+
+def update_each(examples, drop, losses, pipeline, sgd=None):
+    """Update on each example separately, skipping the ones that fail"""
+    for example in examples:
+        try:
+            pipeline.update([example], drop=drop, losses=losses, sgd=sgd)
+        except Exception as e:
+            print(f"Error processing: {example.text[:50]}... - {e}")
+
+def split_dev(examples, dev_split=0.2, seed=0):
+    """Shuffle examples with a fixed seed and hold out the last dev_split share as a dev set"""
+    examples = list(examples)
+    random.Random(seed).shuffle(examples)
+    n_dev = int(len(examples) * dev_split)
+    return examples[:len(examples) - n_dev], examples[len(examples) - n_dev:]
+
+def print_scores(scores, prefix=''):
+    print(f"{prefix}dev P {scores['p']:.3f}  R {scores['r']:.3f}  F {scores['f']:.3f}")
+    for label, label_scores in scores['per_label'].items():
+        print(f"{prefix}  {label:<22} P {label_scores['p']:.3f}  R {label_scores['r']:.3f}  F {label_scores['f']:.3f}")
+
+class BestCheckpoint:
+
+    """
+
+    Keeps the weights of a pipeline's best dev epoch and counts the epochs since it improved.
+
+    """
+
+    def __init__(self, nlp, patience=3, output_dir=None):
+        self.nlp = nlp
+        self.patience = patience
+        self.output_dir = output_dir
+        self.best_scores = None
+        self.best_weights = None
+        self.epochs_without_improvement = 0
+
+    def update(self, scores):
+        """Record an epoch's dev scores, returns True once training should stop"""
+        if self.best_scores is None or scores['f'] > self.best_scores['f']:
+            self.best_scores = scores
+            self.best_weights = self.nlp.to_bytes()
+            self.epochs_without_improvement = 0
+            if self.output_dir is not None:
+                self.nlp.to_disk(self.output_dir)
+            return False
+        self.epochs_without_improvement += 1
+        return self.epochs_without_improvement >= self.patience
+
+    def restore(self):
+        """Load the best weights back into the pipeline, rather than keeping the last epoch"""
+        if self.best_weights is not None:
+            self.nlp.from_bytes(self.best_weights)
+        return self.best_scores
+
+class NERTrainer:
+
+    """
+
+    Trains the NER pipe of its own blank spaCy pipeline.
+
+    Every trainer builds a fresh pipeline, so several can train in the same process or,
+    through sweep(), in a process pool. Per-epoch durations are kept in epoch_times.
+
+    """
+
+    def __init__(self, iterations=10, batch_size=1, compound=None, drop=0.2, dev_split=0.2,
+                 patience=3, output_dir=None, lang='en', seed=0, name=None):
+        # Imported here so importing this module doesn't pay the spaCy startup cost
+        import spacy
+        self.nlp = spacy.blank(lang)
+        self.iterations = iterations
+        self.batch_size = batch_size
+        self.compound = compound
+        self.drop = drop
+        self.dev_split = dev_split
+        self.patience = patience
+        self.output_dir = output_dir
+        self.seed = seed
+        self.name = name
+        self.random = random.Random(seed)
+        self.epoch_times = []
+
+    def log(self, message):
+        print(f"[{self.name}] {message}" if self.name else message)
+
+    def build_examples(self, train_data):
+        """Create the Example objects once so every epoch can reuse them"""
+        from spacy.training import Example
+        examples = []
+        for text, annotations in train_data:
+            try:
+                doc = self.nlp.make_doc(text)
+                examples.append(Example.from_dict(doc, annotations))
+            except Exception as e:
+                print(f"Error processing: {text[:50]}... - {e}")
+        return examples
+
+    def load_examples(self, data):
+        """Examples from a list of (text, annotations) tuples or a .spacy corpus path"""
+        if isinstance(data, str):
+            # A .spacy corpus from utils.corpus.build_docbin, already tokenized and validated
+            from utils.corpus import iter_corpus
+            return list(iter_corpus(data, self.nlp))
+        # Tokenize and align the annotations once instead of every iteration
+        return self.build_examples(data)
+
+    def prepare(self, train_data, dev_data=None):
+        """Add the NER pipe and its labels and return the (train, dev) Examples"""
+        # Add NER pipeline if it doesn't exist
+        if 'ner' not in self.nlp.pipe_names:
+            # Use the string name instead of create_pipe
+            self.nlp.add_pipe('ner', last=True)
+
+        # Get the NER component
+        ner = self.nlp.get_pipe('ner')
+
+        examples = self.load_examples(train_data)
+        labels = {ent.label_ for example in examples for ent in example.reference.ents}
+        if dev_data is not None:
+            dev_examples = self.load_examples(dev_data)
+        else:
+            examples, dev_examples = split_dev(examples, self.dev_split, self.seed)
+
+        # Add labels in the NLP pipeline
+        for label in sorted(labels):
+            ner.add_label(label)
+
+        return examples, dev_examples
+
+    def evaluate(self, examples, labels=None):
+        """
+        Overall and per-label precision, recall and F1 on held-out examples.
+
+        labels defaults to the NER labels of nlp_ner_model/meta.json, labels without
+        predictions or gold entities in examples score 0.
+        """
+        scores = self.nlp.evaluate(examples)
+        per_type = scores.get('ents_per_type') or {}
+        return {
+            'p': scores['ents_p'],
+            'r': scores['ents_r'],
+            'f': scores['ents_f'],
+            'per_label': {
+                label: per_type.get(label, {'p': 0.0, 'r': 0.0, 'f': 0.0})
+                for label in (labels or model_labels())
+            }
+        }
+
+    def end_of_epoch(self, itn, losses, n_examples, elapsed, dev_examples, checkpoint):
+        """Report the epoch and score it on the dev set, returns True once training should stop"""
+        self.epoch_times.append(elapsed)
+        self.log(losses)
+        self.log(f"epoch {itn}: {elapsed:.1f}s, {n_examples / elapsed:.1f} examples/sec")
+        if not dev_examples:
+            return False
+        scores = self.evaluate(dev_examples)
+        print_scores(scores, f"[{self.name}] " if self.name else '')
+        if checkpoint.update(scores):
+            self.log(f"No dev improvement for {checkpoint.patience} epochs, stopping after iteration {itn}")
+            return True
+        return False
+
+    def finish(self, checkpoint):
+        """Restore the best epoch and report the run, without a dev set the last epoch is saved"""
+        scores = checkpoint.restore()
+        if scores is not None:
+            self.log(f"Best dev F1: {scores['f']:.3f}")
+        elif self.output_dir is not None:
+            # No dev scoring, so BestCheckpoint never saved a model
+            self.nlp.to_disk(self.output_dir)
+            self.log(f"Saved the last epoch to {self.output_dir}")
+        if self.epoch_times:
+            self.log(f"{sum(self.epoch_times) / len(self.epoch_times):.1f}s per epoch over {len(self.epoch_times)} epochs")
+        return scores
+
+    def train(self, train_data, dev_data=None):
+        """
+        Train the NER pipe on a list of (text, {'entities': [...]}) tuples or on the path
+        of a .spacy corpus (file or directory of shards) built with utils.corpus.build_docbin.
+
+        Each epoch is scored on dev_data (same formats) or, if not given, on a dev_split share held
+        out of train_data. Training stops once the dev F1 hasn't improved for patience epochs and
+        the best epoch's weights are restored, and saved to output_dir if given. Returns the best
+        dev scores. dev_split=0 trains for all iterations without evaluating.
+        """
+        from spacy.util import minibatch
+        examples, dev_examples = self.prepare(train_data, dev_data)
+
+        # Remove other pipelines if they are there
+        other_pipes = [pipe for pipe in self.nlp.pipe_names if pipe != 'ner']
+        with self.nlp.disable_pipes(*other_pipes):  # only train NER
+            # Initialize the model
+            self.nlp.initialize()
+
+            checkpoint = BestCheckpoint(self.nlp, self.patience, self.output_dir)
+            for itn in range(self.iterations):
+                self.log("Starting iteration " + str(itn))
+                self.random.shuffle(examples)
+                losses = {}
+                start = time.perf_counter()
+
+                for batch in minibatch(examples, size=batch_sizes(self.batch_size, self.compound)):
+                    try:
+                        self.nlp.update(
+                            batch,  # batch of Example objects
+                            drop=self.drop,  # dropout - make it harder to memorise data
+                            losses=losses
+                        )
+                    except Exception:
+                        # Retry one by one so a single bad example doesn't drop the batch
+                        update_each(batch, self.drop, losses, self.nlp)
+
+                elapsed = time.perf_counter() - start
+                if self.end_of_epoch(itn, losses, len(examples), elapsed, dev_examples, checkpoint):
+                    break
+
+            return self.finish(checkpoint)
+
+    def train_parallel(self, train_data, dev_data=None, n_workers=None, sync_every=1):
+        """
+        Data-parallel CPU training: the training examples are sharded across n_workers processes
+        (default: all cores) that each update their own copy of the model.
+
+        After every sync_every minibatch steps the workers' weights are averaged in shared memory and
+        every worker continues from the average, so an epoch takes about 1/n_workers of the updates of
+        train. Raising sync_every cuts the synchronisation cost for large models.
+        Data, dev evaluation and early stopping work as in train. Workers use the fixed batch_size,
+        a compounding batch size is not supported.
+        """
+        if self.compound is not None:
+            raise ValueError("train_parallel uses a fixed batch_size, compound is only supported by train")
+        from utils.corpus import examples_to_bytes
+        examples, dev_examples = self.prepare(train_data, dev_data)
+        # No more workers than examples, so every shard has some
+        n_workers = min(n_workers or os.cpu_count() or 1, max(len(examples), 1))
+        self.nlp.initialize()
+        params = model_params(self.nlp.get_pipe('ner').model)
+        n_params = params_size(params)
+
+        self.random.shuffle(examples)
+        shards = [examples_to_bytes(examples[rank::n_workers]) for rank in range(n_workers)]
+        steps_per_epoch = math.ceil(math.ceil(len(examples) / n_workers) / self.batch_size)
+
+        shm = shared_memory.SharedMemory(create=True, size=(n_workers + 1) * n_params * 4)
+        weights = np.ndarray((n_workers + 1, n_params), dtype=np.float32, buffer=shm.buf)
+        read_params(params, weights[n_workers])
+
+        context = multiprocessing.get_context('spawn')
+        connections = []
+        workers = []
+        try:
+            with tempfile.TemporaryDirectory() as model_dir:
+                # Workers start from the same initialized model
+                self.nlp.to_disk(model_dir)
+                for rank in range(n_workers):
+                    parent_end, worker_end = context.Pipe()
+                    worker = context.Process(
+                        target=parallel_worker,
+                        args=(rank, n_workers, model_dir, shards[rank], shm.name, n_params,
+                              worker_end, self.batch_size, self.drop, self.seed)
+                    )
+                    worker.start()
+                    # Only the worker holds its end, so recv sees EOF if the worker dies
+                    worker_end.close()
+                    connections.append(parent_end)
+                    workers.append(worker)
+
+                checkpoint = BestCheckpoint(self.nlp, self.patience, self.output_dir)
+                for itn in range(self.iterations):
+                    self.log("Starting iteration " + str(itn))
+                    losses = {'ner': 0.0}
+                    n_examples = 0
+                    start = time.perf_counter()
+
+                    for step in range(0, steps_per_epoch, sync_every):
+                        for connection in connections:
+                            connection.send(min(sync_every, steps_per_epoch - step))
+                        for rank, connection in enumerate(connections):
+                            loss, count = receive(connection, workers[rank], rank)
+                            losses['ner'] += loss
+                            n_examples += count
+                        # Average the workers' weights into the shared row they all start the next round from
+                        np.mean(weights[:n_workers], axis=0, out=weights[n_workers])
+
+                    elapsed = time.perf_counter() - start
+                    write_params(params, weights[n_workers])
+                    if self.end_of_epoch(itn, losses, n_examples, elapsed, dev_examples, checkpoint):
+                        break
+        finally:
+            try:
+                for connection in connections:
+                    try:
+                        connection.send(None)
+                    except (BrokenPipeError, OSError):
+                        # The worker has died, don't hide the error that got us here
+                        pass
+                for worker in workers:
+                    worker.join()
+            finally:
+                del weights
+                shm.close()
+                shm.unlink()
+
+        return self.finish(checkpoint)
+
+def receive(connection, worker, rank, poll_interval=1.0):
+    """Next message of a training worker, raises RuntimeError if the worker has died"""
+    while not connection.poll(poll_interval):
+        if not worker.is_alive():
+            raise RuntimeError(f"Training worker {rank} exited with code {worker.exitcode}")
+    try:
+        return connection.recv()
+    except EOFError:
+        worker.join()
+        raise RuntimeError(f"Training worker {rank} exited with code {worker.exitcode}")
+
+def model_params(model):
+    """(node, name) of every parameter of a thinc model, in the same order in every process"""
+    return [(node, name) for node in model.walk() for name in node.param_names if node.has_param(name)]
+
+def params_size(params):
+    return sum(node.get_param(name).size for node, name in params)
+
+def read_params(params, out):
+    """Copy the parameters into the flat float32 array out"""
+    offset = 0
+    for node, name in params:
+        value = node.get_param(name)
+        out[offset:offset + value.size] = value.ravel()
+        offset += value.size
+
+def write_params(params, flat):
+    """Set the parameters from the flat array written by read_params"""
+    offset = 0
+    for node, name in params:
+        value = node.get_param(name)
+        node.set_param(name, flat[offset:offset + value.size].reshape(value.shape).copy())
+        offset += value.size
+
+def parallel_worker(rank, n_workers, model_dir, shard, shm_name, n_params, connection, batch_size, drop, seed):
+    """
+    Training process for NERTrainer.train_parallel.
+
+    Each round it loads the averaged weights from shared memory, runs the requested number
+    of minibatch updates on its own shard and writes its weights back to its row.
+    """
+    import spacy
+    from spacy.util import minibatch
+    from utils.corpus import examples_from_bytes
+    worker_nlp = spacy.load(model_dir)
+    params = model_params(worker_nlp.get_pipe('ner').model)
+    examples = examples_from_bytes(shard, worker_nlp)
+    optimizer = worker_nlp.create_optimizer()
+    rng = random.Random(seed + rank)
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    weights = np.ndarray((n_workers + 1, n_params), dtype=np.float32, buffer=shm.buf)
+    batches = iter(())
+    try:
+        while True:
+            steps = connection.recv()
+            if steps is None:
+                break
+
+            write_params(params, weights[n_workers])
             losses = {}
-            
-            for text, annotations in train_data:
+            n_examples = 0
+            # An empty shard still answers every round, with no updates
+            for _ in range(steps if examples else 0):
+                batch = next(batches, None)
+                if batch is None:
+                    rng.shuffle(examples)
+                    batches = iter(minibatch(examples, size=batch_size))
+                    batch = next(batches)
                 try:
-                    # Create Example objects for training
-                    doc = nlp.make_doc(text)
-                    example = spacy.training.Example.from_dict(doc, annotations)
-                    
-                    nlp.update(
-                        [example],  # batch of Example objects
-                        drop=0.2,  # dropout - make it harder to memorise data
-                        losses=losses
-                    )
-                except Exception as e:
-                    print(f"Error processing: {text[:50]}... - {e}")
-                    
-            print(losses)
+                    worker_nlp.update(batch, drop=drop, losses=losses, sgd=optimizer)
+                except Exception:
+                    update_each(batch, drop, losses, worker_nlp, optimizer)
+                n_examples += len(batch)
+
+            read_params(params, weights[rank])
+            connection.send((losses.get('ner', 0.0), n_examples))
+    finally:
+        del weights
+        shm.close()
+
+def run_config(config, train_data, dev_data=None):
+    """Train one configuration of a sweep, returns its config, best dev scores and epoch times"""
+    trainer = NERTrainer(**config)
+    scores = trainer.train(train_data, dev_data)
+    return {'config': config, 'scores': scores, 'epoch_times': trainer.epoch_times}
+
+def sweep(train_data, configs, dev_data=None, n_workers=None):
+    """
+    Train every configuration (a dict of NERTrainer arguments) in its own process.
+
+    train_data and dev_data are best given as .spacy corpus paths so each process reads them
+    itself. Returns one result per config, from the best dev F1 down.
+    """
+    configs = [dict(config) for config in configs]
+    for i, config in enumerate(configs):
+        config.setdefault('name', f"run {i}")
+    n_workers = min(n_workers or os.cpu_count() or 1, len(configs))
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=context) as pool:
+        results = list(pool.map(run_config, configs, [train_data] * len(configs), [dev_data] * len(configs)))
+
+    for result in results:
+        f = result['scores']['f'] if result['scores'] else 0.0
+        times = result['epoch_times']
+        print(f"{result['config']['name']}: F {f:.3f}, {sum(times) / max(len(times), 1):.1f}s per epoch - {result['config']}")
+    return sorted(results, key=lambda result: result['scores']['f'] if result['scores'] else 0.0, reverse=True)
+
+def train_model(train_data, iterations=10, batch_size=1, compound=None, drop=0.2,
+                dev_data=None, dev_split=0.2, patience=3, output_dir=None):
+    """Train a fresh pipeline with NERTrainer.train and return its best dev scores"""
+    trainer = NERTrainer(iterations=iterations, batch_size=batch_size, compound=compound, drop=drop,
+                         dev_split=dev_split, patience=patience, output_dir=output_dir)
+    return trainer.train(train_data, dev_data)
+
+def train_model_parallel(train_data, n_workers=None, iterations=10, batch_size=8, drop=0.2, sync_every=1,
+                         dev_data=None, dev_split=0.2, patience=3, output_dir=None):
+    """Train a fresh pipeline with NERTrainer.train_parallel and return its best dev scores"""
+    trainer = NERTrainer(iterations=iterations, batch_size=batch_size, drop=drop,
+                         dev_split=dev_split, patience=patience, output_dir=output_dir)
+    return trainer.train_parallel(train_data, dev_data, n_workers=n_workers, sync_every=sync_every)
 
 # # Start Training model
-# train_model(train_data)
\ No newline at end of file
+# train_model(train_data)
+# # Or from the validated binary corpus
+# build_docbin(load_train_data(), 'data/train.spacy')
+# train_model('data/train.spacy', batch_size=8)
+# # Or with a compounding batch size
+# train_model(train_data, compound=(4.0, 32.0, 1.001))
+# # Keep the best epoch on disk and stop after 2 epochs without dev improvement
+# train_model(train_data, iterations=30, patience=2, output_dir='nlp_ner_model')
+# # Data-parallel on every core (call from under `if __name__ == '__main__':` in a script)
+# train_model_parallel('data/train.spacy', batch_size=8)
+# # Hyperparameter sweep, one process per configuration
+# sweep('data/train.spacy', [{'drop': 0.2, 'batch_size': 8}, {'drop': 0.35, 'batch_size': 16}])
@@ -0,0 +1,396 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+from utils.documents import READERS
+from utils.ner import MODEL_PATH
+from utils.records import entities_to_record
+from utils.result_cache import ResumeResultCache, sha256_bytes, sha256_text
+
+
+# Per worker process, set by init_worker
+extractor = None
+
+
+def init_worker(model_path, max_chars):
+    global extractor
+    from utils.ner import ResumeEntityExtractor
+    extractor = ResumeEntityExtractor(model_path)
+    extractor.max_chars = max_chars
+
+
+def parse_batch(texts):
+    """[{'entities': ..., 'record': ...}] for a micro-batch of texts, run in a worker process"""
+    results = []
+    for entities in extractor.extract_chunked(texts, max_chars=extractor.max_chars):
+        results.append({'entities': entities, 'record': entities_to_record(entities)})
+    return results
+
+
+def file_bytes_text(data, filename):
+    """Normalized text of an uploaded .pdf/.docx/.txt file"""
+    from utils.documents import extract_text
+    extension = os.path.splitext(filename)[1].lower()
+    with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as file:
+        file.write(data)
+    try:
+        return extract_text(file.name)
+    finally:
+        os.remove(file.name)
+
+
+class Overloaded(Exception):
+    pass
+
+
+class ExtractionFailed(Exception):
+    pass
+
+
+class MicroBatcher:
+
+    """
+
+    Queues parse requests and runs them through nlp.pipe in micro-batches on a process pool.
+
+    A batch is cut at max_batch texts or max_wait_ms after its first request. At most one batch
+    per worker is in flight and at most max_queue requests wait, beyond that submit raises
+    Overloaded, so latency stays bounded under load instead of the queue growing.
+
+    Text extraction of uploaded files runs on its own pool of extract_workers processes, so it
+    never holds up an NER worker. Pending extractions count against max_queue too. A pool whose
+    process died is replaced, so one crashing request doesn't fail every later one.
+
+    With a cache_path, extracted texts and entities are kept in a ResumeResultCache, so a
+    re-uploaded file or a repeated text is answered without extraction or the NER pool.
+
+    """
+
+    def __init__(self, model_path=MODEL_PATH, n_workers=1, max_batch=32, max_wait_ms=10, max_queue=1024,
+                 max_chars=2000, extract_workers=1, cache_path=None):
+        self.model_path = model_path
+        self.cache_path = cache_path
+        self.cache = None
+        self.n_workers = n_workers
+        self.extract_workers = extract_workers
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.max_chars = max_chars
+        self.queue = None
+        self.pool = None
+        self.extract_pool = None
+        self.extracting = 0
+        self.tasks = []
+
+        self.started = time.monotonic()
+        self.latencies = deque(maxlen=10000)
+        self.batch_sizes = deque(maxlen=1000)
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.cache_hits = 0
+
+    def new_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+            initargs=(self.model_path, self.max_chars)
+        )
+
+    def new_extract_pool(self):
+        return ProcessPoolExecutor(max_workers=self.extract_workers, mp_context=multiprocessing.get_context('spawn'))
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        if self.cache_path:
+            self.cache = ResumeResultCache(self.cache_path, self.model_path, variant=f"chunked-{self.max_chars}")
+        self.pool = self.new_pool()
+        self.extract_pool = self.new_extract_pool()
+        # Load the model in every worker before taking traffic
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, parse_batch, ['warm up']) for _ in range(self.n_workers)))
+        self.tasks = [asyncio.create_task(self.run_batches()) for _ in range(self.n_workers)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.pool.shutdown()
+        self.extract_pool.shutdown()
+        if self.cache is not None:
+            self.cache.close()
+
+    async def submit(self, text):
+        """Parse one text, raises Overloaded when the queue is full"""
+        if self.cache is not None:
+            text_sha256 = sha256_text(text)
+            entities = self.cache.cached_entities([text_sha256]).get(text_sha256)
+            if entities is not None:
+                self.cache.touch([text_sha256])
+                self.cache_hits += 1
+                return {'entities': entities, 'record': entities_to_record(entities)}
+        future = asyncio.get_running_loop().create_future()
+        if self.queue.qsize() + self.extracting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded()
+        self.queue.put_nowait((text, future, time.perf_counter()))
+        return await future
+
+    async def extract(self, data, filename):
+        """
+        Text of an uploaded file, raises Overloaded when the queue is full and ExtractionFailed
+        with the reader's message when the file can't be read
+        """
+        if self.cache is not None:
+            file_sha256 = sha256_bytes(data)
+            text = self.cache.cached_file_text(file_sha256)
+            if text is not None:
+                self.cache_hits += 1
+                return text
+        if self.queue.qsize() + self.extracting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded()
+        self.extracting += 1
+        pool = self.extract_pool
+        try:
+            text = await asyncio.get_running_loop().run_in_executor(pool, file_bytes_text, data, filename)
+        except BrokenProcessPool:
+            if self.extract_pool is pool:
+                print("Error: text extraction process died, starting a new pool")
+                self.extract_pool = self.new_extract_pool()
+                pool.shutdown(wait=False)
+            raise ExtractionFailed(f"Text extraction crashed on {filename}")
+        except Exception as e:
+            raise ExtractionFailed(f"{type(e).__name__}: {e}")
+        finally:
+            self.extracting -= 1
+        if self.cache is not None:
+            self.cache.add_file_text(file_sha256, text)
+        return text
+
+    async def parse(self, texts):
+        """parse_batch on the NER pool, replacing the pool if one of its processes died"""
+        pool = self.pool
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, parse_batch, texts)
+        except BrokenProcessPool:
+            if self.pool is pool:
+                print("Error: NER process died, starting a new pool")
+                self.pool = self.new_pool()
+                pool.shutdown(wait=False)
+            raise
+
+    async def run_batches(self):
+        """One per worker: collect a micro-batch, parse it, resolve its futures"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.batch_sizes.append(len(batch))
+            try:
+                results = await self.parse([text for text, _, _ in batch])
+            except Exception as e:
+                print(f"Error parsing batch of {len(batch)}: {e}")
+                if len(batch) == 1:
+                    self.fail(batch[0], e)
+                    continue
+                # Retry one by one so only the request that broke the batch fails
+                for request in batch:
+                    try:
+                        self.resolve(request, (await self.parse([request[0]]))[0])
+                    except Exception as error:
+                        self.fail(request, error)
+                continue
+
+            for request, result in zip(batch, results):
+                self.resolve(request, result)
+
+    def resolve(self, request, result):
+        text, future, queued = request
+        self.latencies.append(time.perf_counter() - queued)
+        self.completed += 1
+        if self.cache is not None:
+            self.cache.store_entities([(text, result['entities'])])
+        if not future.done():
+            future.set_result(result)
+
+    def fail(self, request, error):
+        _, future, _ = request
+        self.failed += 1
+        if not future.done():
+            future.set_exception(error)
+
+    def metrics(self):
+        """Request counts, throughput, queue depth and p50/p95/p99 latency over the last 10000 requests"""
+        latencies = np.array(self.latencies) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+        uptime = time.monotonic() - self.started
+        return {
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'failed': self.failed,
+            'cache_hits': self.cache_hits,
+            'queued': self.queue.qsize() if self.queue else 0,
+            'requests_per_sec': self.completed / uptime if uptime else 0.0,
+            'mean_batch_size': float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            'latency_ms': {'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+        }
+
+
+class ResumeService:
+
+    """
+
+    Minimal asyncio HTTP/1.1 server in front of a MicroBatcher.
+
+    POST /parse         JSON {"text": ...}, plain text, or a .pdf/.docx/.txt file with ?filename=
+    GET  /metrics       MicroBatcher.metrics()
+    GET  /health
+
+    /parse answers {"entities": {...}, "record": {...}} where record is in the JSONL schema
+    of DataframesFromJSONL, 422 for an upload that can't be read, or 503 when the queue is full.
+
+    """
+
+    def __init__(self, batcher, max_body=20 * 1024 * 1024):
+        self.batcher = batcher
+        self.max_body = max_body
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > self.max_body:
+                    await self.respond(writer, 413, {'error': 'Request body too large'}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, payload = await self.route(method, target, headers, body)
+                except Exception as e:
+                    print(f"Error handling {method} {target}: {e}")
+                    status, payload = 500, {'error': str(e)}
+                close = headers.get('connection', '').lower() == 'close'
+                await self.respond(writer, status, payload, close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, target, headers, body):
+        url = urlsplit(target)
+        if method == 'GET' and url.path == '/health':
+            return 200, {'status': 'ok'}
+        if method == 'GET' and url.path == '/metrics':
+            return 200, self.batcher.metrics()
+        if method != 'POST' or url.path != '/parse':
+            return 404, {'error': f"No route for {method} {url.path}"}
+
+        filename = parse_qs(url.query).get('filename', [None])[0]
+        try:
+            if filename:
+                if os.path.splitext(filename)[1].lower() not in READERS:
+                    return 415, {'error': f"Unsupported resume format: {filename}"}
+                text = await self.batcher.extract(body, filename)
+            elif headers.get('content-type', '').startswith('application/json'):
+                payload = json.loads(body)
+                if not isinstance(payload, dict) or not isinstance(payload.get('text'), str):
+                    return 400, {'error': 'Bad request: expected a JSON object with a "text" string'}
+                text = payload['text']
+            else:
+                text = body.decode('utf-8', errors='replace')
+        except Overloaded:
+            return 503, {'error': 'Overloaded, retry later'}
+        except ExtractionFailed as e:
+            return 422, {'error': f"Could not read {filename}: {e}"}
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {'error': f"Bad request: {e}"}
+
+        try:
+            return 200, await self.batcher.submit(text)
+        except Overloaded:
+            return 503, {'error': 'Overloaded, retry later'}
+        except Exception as e:
+            return 500, {'error': str(e)}
+
+    async def respond(self, writer, status, payload, close=False):
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large',
+                   415: 'Unsupported Media Type', 422: 'Unprocessable Entity', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+        body = json.dumps(payload).encode('utf-8')
+        head = [
+            f"HTTP/1.1 {status} {reasons.get(status, '')}",
+            'Content-Type: application/json',
+            f"Content-Length: {len(body)}",
+            f"Connection: {'close' if close else 'keep-alive'}"
+        ]
+        if status == 503:
+            head.append('Retry-After: 1')
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+
+async def serve(host='127.0.0.1', port=8000, **batcher_options):
+    batcher = MicroBatcher(**batcher_options)
+    await batcher.start()
+    service = ResumeService(batcher)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"Serving resume parsing on http://{host}:{port} with {batcher.n_workers} workers")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Resume parsing HTTP service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--max-batch', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=10)
+    parser.add_argument('--max-queue', type=int, default=1024)
+    parser.add_argument('--extract-workers', type=int, default=1, help='processes extracting text from uploads')
+    parser.add_argument('--cache', default=None, help='SQLite file caching extracted texts and entities')
+    args = parser.parse_args()
+    asyncio.run(serve(
+        args.host, args.port, model_path=args.model, n_workers=args.workers,
+        max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, max_queue=args.max_queue,
+        extract_workers=args.extract_workers, cache_path=args.cache
+    ))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The scripts and utils/ are imported from the repository root, as when running them there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,90 @@
+import os
+
+import pandas as pd
+import pytest
+
+from batch import BatchRun, read_output
+from utils.table_cache import TableCache
+
+
+RESUMES = [
+    "John Smith  Python Developer  Pune, Maharashtra  SKILLS  Python, Django, SQL",
+    "Alice Clark  Data Scientist  Bengaluru, Karnataka  SKILLS  Machine Learning, Pandas",
+    "Rahul Kumar  Java Developer  Mumbai  EDUCATION  B.Tech Computer Science 2015",
+    "Priya Shah  Frontend Engineer  Delhi  SKILLS  React, JavaScript, CSS",
+    "Mark Novak  DevOps Engineer  Chennai  SKILLS  Docker, Kubernetes, AWS"
+]
+
+
+@pytest.fixture
+def resume_paths(tmp_path):
+    paths = []
+    for i, text in enumerate(RESUMES):
+        path = tmp_path / 'resumes' / f"resume_{i}.txt"
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(text)
+        paths.append(str(path))
+    return paths
+
+
+def assert_same_output(left, right):
+    assert sorted(left) == sorted(right)
+    for table in left:
+        pd.testing.assert_frame_equal(left[table], right[table])
+
+
+def test_interrupted_run_resumes_to_the_same_output(tmp_path, resume_paths, monkeypatch):
+    BatchRun(resume_paths, str(tmp_path / 'full'), n_workers=1, chunk_size=2).run()
+
+    write_chunk = BatchRun.write_chunk
+    def interrupt(self, chunk, frames):
+        if chunk == 1:
+            raise KeyboardInterrupt()
+        write_chunk(self, chunk, frames)
+    monkeypatch.setattr(BatchRun, 'write_chunk', interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        BatchRun(resume_paths, str(tmp_path / 'resumed'), n_workers=1, chunk_size=2).run()
+    monkeypatch.setattr(BatchRun, 'write_chunk', write_chunk)
+    state = BatchRun(resume_paths, str(tmp_path / 'resumed'), n_workers=1, chunk_size=2).run()
+
+    assert state['chunks_done'] == 3 and state['records'] == 5
+    assert_same_output(read_output(str(tmp_path / 'resumed')), read_output(str(tmp_path / 'full')))
+
+
+def test_rerun_with_other_chunk_size_replaces_old_parts(tmp_path, resume_paths):
+    output_dir = str(tmp_path / 'out')
+    BatchRun(resume_paths, output_dir, n_workers=1, chunk_size=1).run()
+    other = tmp_path / 'out' / 'notes'
+    other.mkdir()
+    (other / 'part-00000.arrow').write_text('not ours')
+
+    BatchRun(resume_paths, output_dir, n_workers=1, chunk_size=3).run()
+    candidates = read_output(output_dir)['candidates']
+    assert candidates['candidate_id'].tolist() == list(range(5))
+    # Directories the run doesn't write are left alone
+    assert (other / 'part-00000.arrow').exists()
+
+
+def test_refuses_to_write_into_a_table_cache(tmp_path, resume_paths):
+    cache_dir = tmp_path / 'cache' / 'plain'
+    source = tmp_path / 'resumes.jsonl'
+    source.write_text('')
+    TableCache(str(cache_dir), str(source)).write_manifest({})
+    with pytest.raises(ValueError):
+        BatchRun(resume_paths, str(tmp_path / 'cache'), n_workers=1).run()
+    assert os.listdir(cache_dir) == ['manifest.json']
+
+
+def test_rerun_with_cache_skips_extraction_and_ner(tmp_path, resume_paths, monkeypatch):
+    cache_path = str(tmp_path / 'cache.sqlite')
+    BatchRun(resume_paths, str(tmp_path / 'first'), n_workers=1, chunk_size=2, cache_path=cache_path).run()
+
+    def extract_texts(paths, *args, **kwargs):
+        assert not paths, 'cached resumes were extracted again'
+        return iter([])
+    def get_extractor(self):
+        raise AssertionError('cached resumes were parsed again')
+    monkeypatch.setattr('batch.extract_texts', extract_texts)
+    monkeypatch.setattr(BatchRun, 'get_extractor', get_extractor)
+    BatchRun(resume_paths, str(tmp_path / 'second'), n_workers=1, chunk_size=2, cache_path=cache_path).run()
+    assert_same_output(read_output(str(tmp_path / 'second')), read_output(str(tmp_path / 'first')))
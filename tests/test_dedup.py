@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from utils.dedup import CLEAN_COLUMNS, DUPLICATE_EXCEPTIONS, UNWANTED_VALUES, dedup_candidates
+
+
+def random_candidates(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    def column(values):
+        return rng.choice(np.array(values, dtype=object), n)
+    candidates = pd.DataFrame({
+        'candidate_id': np.arange(n),
+        'name': column([f"name {i}" for i in range(n)] + ['Unknown']),
+        'email': column([f"e{i}@x.com" for i in range(3 * n)] + ['Not Provided', None]),
+        'summary': column([f"summary {i}" for i in range(n // 4)] + ['']),
+        'phone': column([f"{i:010d}" for i in range(3 * n)] + ['no']),
+        'city': column(['London', 'Paris', 'Unknown']),
+        'country': column(['UK', 'France']),
+        'remote_preference': column(['remote', 'onsite', 'hybrid']),
+        'linkedin': column([f"in/{i}" for i in range(3 * n)]),
+        'github': column([f"gh/{i}" for i in range(3 * n)] + [None])
+    })
+    return candidates
+
+
+def reference_dedup(candidates):
+    """The notebook's passes, with every duplicate mask taken on the same rows"""
+    df = candidates.dropna(subset=CLEAN_COLUMNS)
+    df = df[~df[CLEAN_COLUMNS].isin(UNWANTED_VALUES).any(axis=1)]
+    df = df[df['summary'].map(df['summary'].value_counts()) > 1]
+    checked = [col for col in df.columns if not col.endswith('_id') and col not in DUPLICATE_EXCEPTIONS]
+    duplicated = pd.concat([df[col].duplicated() for col in checked], axis=1).any(axis=1)
+    return df[~duplicated]
+
+
+def test_matches_the_pandas_passes():
+    for seed in range(5):
+        candidates = random_candidates(seed=seed)
+        kept, report = dedup_candidates(candidates)
+        expected = reference_dedup(candidates)
+        pd.testing.assert_frame_equal(kept, expected)
+        assert report['rows'] == len(candidates) and report['kept'] == len(expected)
+        assert report['unwanted'] + report['unique_summary'] + report['duplicated'] == report['rows'] - report['kept']
+
+
+def test_result_does_not_depend_on_column_order():
+    candidates = random_candidates()
+    kept, _ = dedup_candidates(candidates)
+    reordered, _ = dedup_candidates(candidates[candidates.columns[::-1]])
+    pd.testing.assert_frame_equal(reordered[kept.columns], kept)
+
+
+def test_report_counts_per_column():
+    candidates = pd.DataFrame({
+        'candidate_id': [0, 1, 2, 3],
+        'name': ['a', 'b', 'a', 'c'],
+        'email': ['x', 'x', 'y', 'Unknown'],
+        'summary': ['s', 's', 's', 's']
+    })
+    kept, report = dedup_candidates(candidates, clean_columns=['name', 'email'])
+    assert kept['candidate_id'].tolist() == [0]
+    assert report == {'rows': 4, 'unwanted': 1, 'unique_summary': 0, 'duplicated': 2,
+                      'duplicates_per_column': {'name': 1, 'email': 1}, 'kept': 1}
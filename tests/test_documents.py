@@ -0,0 +1,21 @@
+from batch import resume_paths
+from utils.documents import extract_texts, iter_resume_files, normalize_whitespace
+
+
+def test_txt_files_are_opt_in(tmp_path):
+    for name in ('a.pdf', 'b.docx', 'train_data.txt', 'notes.md'):
+        (tmp_path / name).write_text('x')
+    assert [path.split('/')[-1] for path in iter_resume_files(str(tmp_path))] == ['a.pdf', 'b.docx']
+    assert len(resume_paths([str(tmp_path)])) == 2
+    assert len(resume_paths([str(tmp_path)], include_txt=True)) == 3
+    assert len(resume_paths([str(tmp_path / '*.txt')], include_txt=True)) == 1
+
+
+def test_extract_texts_reports_failures(tmp_path):
+    good = tmp_path / 'good.txt'
+    good.write_text('John   Smith\n\nPython')
+    bad = tmp_path / 'bad.pdf'
+    bad.write_bytes(b'not a pdf')
+    texts = dict(extract_texts([str(good), str(bad)], n_workers=1))
+    assert texts == {str(good): normalize_whitespace('John   Smith\n\nPython'), str(bad): None}
+    assert texts[str(good)] == 'John Smith  Python'
@@ -0,0 +1,59 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from utils.minhash import MinHashLSH, duplicate_groups, near_duplicate_summaries, shingles
+
+
+TEMPLATE = "Experienced {} Developer with a strong background in building scalable web applications and APIs"
+
+
+def random_texts(n, seed=0, length=20):
+    rng = np.random.default_rng(seed)
+    words = np.array([f"w{i}" for i in range(2000)])
+    return [' '.join(rng.choice(words, length)) for _ in range(n)]
+
+
+def test_signature_estimates_jaccard():
+    lsh = MinHashLSH(num_perm=256, bands=64)
+    a, b = TEMPLATE.format('Python'), TEMPLATE.format('Java') + ' and cloud services'
+    shingles_a, shingles_b = set(shingles(a)), set(shingles(b))
+    jaccard = len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+    estimate = (lsh.signature(a) == lsh.signature(b)).mean()
+    assert abs(estimate - jaccard) < 0.1
+
+
+def test_candidate_pairs_are_the_pairs_sharing_a_band():
+    lsh = MinHashLSH(num_perm=32, bands=16)
+    texts = random_texts(40) + [TEMPLATE.format(language) for language in ('Python', 'Java', 'Go', 'Rust')]
+    signatures = lsh.signatures(texts)
+    expected = {
+        (i, j) for i, j in itertools.combinations(range(len(texts)), 2)
+        if any((signatures[i, band * 2:band * 2 + 2] == signatures[j, band * 2:band * 2 + 2]).all() for band in range(16))
+    }
+    assert set(map(tuple, lsh.candidate_pairs(signatures).tolist())) == expected
+
+
+def test_near_duplicates_finds_templated_texts_only():
+    texts = random_texts(200) + [TEMPLATE.format(language) for language in ('Python', 'Java')]
+    pairs = MinHashLSH().near_duplicates(texts, threshold=0.5)
+    assert pairs[['key_a', 'key_b']].values.tolist() == [[200, 201]]
+
+
+def test_exact_copies_pair_with_the_first_occurrence():
+    texts = ['same text here'] * 4 + ['other words entirely', '', 'same text here']
+    pairs = MinHashLSH().near_duplicates(texts, keys=list('abcdefg'))
+    assert sorted(pairs[['key_a', 'key_b']].values.tolist()) == [['a', 'b'], ['a', 'c'], ['a', 'd'], ['a', 'g']]
+    assert (pairs['similarity'] == 1.0).all()
+    groups = duplicate_groups(pairs)
+    assert groups.index.tolist() == list('abcdg') and groups.nunique() == 1
+
+
+def test_summaries_skip_missing_values():
+    candidates = pd.DataFrame({
+        'candidate_id': [10, 11, 12, 13, 14],
+        'summary': ['Unknown', 'Unknown', None, TEMPLATE.format('Python'), TEMPLATE.format('Python')]
+    })
+    pairs = near_duplicate_summaries(candidates, sentinel='Unknown')
+    assert pairs[['key_a', 'key_b']].values.tolist() == [[13, 14]]
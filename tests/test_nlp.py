@@ -0,0 +1,43 @@
+import multiprocessing
+import os
+
+import pytest
+
+import nlp
+from utils.corpus import load_train_data
+
+
+def test_train_parallel_rejects_compound():
+    trainer = nlp.NERTrainer(compound=(4.0, 32.0, 1.001))
+    with pytest.raises(ValueError):
+        trainer.train_parallel(load_train_data()[:3], n_workers=2)
+
+
+def test_train_parallel_more_workers_than_examples():
+    before = set(os.listdir('/dev/shm'))
+    trainer = nlp.NERTrainer(iterations=1, batch_size=2, dev_split=0)
+    trainer.train_parallel(load_train_data()[:3], n_workers=4)
+    assert len(trainer.epoch_times) == 1
+    assert not multiprocessing.active_children()
+    assert set(os.listdir('/dev/shm')) - before == set()
+
+
+def test_receive_raises_when_worker_dies():
+    context = multiprocessing.get_context('spawn')
+    parent_end, worker_end = context.Pipe()
+    worker = context.Process(target=os._exit, args=(3,))
+    worker.start()
+    worker_end.close()
+    with pytest.raises(RuntimeError, match='exited with code 3'):
+        nlp.receive(parent_end, worker, 0, poll_interval=0.1)
+
+
+@pytest.mark.parametrize('parallel', [False, True])
+def test_output_dir_saved_without_dev_set(tmp_path, parallel):
+    import spacy
+    trainer = nlp.NERTrainer(iterations=1, batch_size=2, dev_split=0, output_dir=str(tmp_path / 'model'))
+    if parallel:
+        trainer.train_parallel(load_train_data()[:3], n_workers=2)
+    else:
+        trainer.train(load_train_data()[:3])
+    assert 'ner' in spacy.load(tmp_path / 'model').pipe_names
@@ -0,0 +1,34 @@
+import pandas as pd
+
+from utils.ranking import RankingIndex, tokenize
+
+
+def tables():
+    return {
+        'candidates': pd.DataFrame({'candidate_id': [0, 1, 2],
+                                    'summary': ['Python backend developer', 'Java developer', 'Unknown']}),
+        'skills': pd.DataFrame({'candidate_id': [0, 0, 1, 2], 'skill_name': ['Django', 'SQL', 'Spring', 'C++']}),
+        'experience_technologies': pd.DataFrame({'experience_id': [0], 'candidate_id': [1], 'term_id': [0]}),
+        'experience_tools': pd.DataFrame({'experience_id': [0], 'candidate_id': [2], 'term_id': [1]}),
+        'vocabulary': pd.DataFrame({'term_id': [0, 1], 'term': ['Kafka', 'Git']})
+    }
+
+
+def test_tokenize_keeps_language_names():
+    assert tokenize('C++, C# and Node.js.') == ['c++', 'c#', 'and', 'node.js']
+
+
+def test_rank_orders_matches_and_drops_non_matches(tmp_path):
+    for scoring in ('bm25', 'tfidf'):
+        index = RankingIndex.from_tables(tables(), scoring)
+        ranked = index.rank('Python Django developer', k=3)
+        assert ranked['candidate_id'].tolist() == [0, 1]
+        assert ranked['score'].is_monotonic_decreasing
+
+        index.save(tmp_path / f"{scoring}.npz")
+        loaded = RankingIndex.load(tmp_path / f"{scoring}.npz")
+        pd.testing.assert_frame_equal(loaded.rank('kafka java', k=2), index.rank('kafka java', k=2))
+
+
+def test_rank_without_any_matching_term():
+    assert RankingIndex.from_tables(tables()).rank('cobol', k=5).empty
@@ -0,0 +1,34 @@
+from utils.result_cache import ResumeResultCache
+
+
+def test_file_text_hit_keeps_its_text_from_eviction(tmp_path, monkeypatch):
+    monkeypatch.setattr('utils.result_cache.extract_text', lambda path: open(path).read())
+    cache = ResumeResultCache(str(tmp_path / 'cache.sqlite'), max_entries=2)
+    paths = []
+    for name in ('a', 'b', 'c'):
+        path = tmp_path / f"{name}.txt"
+        path.write_text(f"resume {name}")
+        paths.append(str(path))
+
+    cache.file_text(paths[0])
+    cache.file_text(paths[1])
+    # Reading a again makes b the least recently used text
+    assert cache.file_text(paths[0]) == 'resume a'
+    cache.file_text(paths[2])
+
+    texts = {text for text, in cache.connection.execute("SELECT text FROM texts")}
+    assert texts == {'resume a', 'resume c'}
+    cache.close()
+
+
+def test_entities_only_extracts_misses(tmp_path):
+    cache = ResumeResultCache(str(tmp_path / 'cache.sqlite'), variant='test')
+    calls = []
+    def extract(texts):
+        calls.append(texts)
+        return [{'NAME': [text]} for text in texts]
+
+    assert cache.entities(['x', 'y', 'x'], extract=extract) == [{'NAME': ['x']}, {'NAME': ['y']}, {'NAME': ['x']}]
+    assert cache.entities(['y', 'z'], extract=extract) == [{'NAME': ['y']}, {'NAME': ['z']}]
+    assert calls == [['x', 'y'], ['z']]
+    cache.close()
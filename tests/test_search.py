@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.search import CandidateIndex, tokenize_query
+
+
+def tables():
+    return {
+        'candidates': pd.DataFrame({
+            'candidate_id': [0, 1, 2, 3, 4],
+            'city': ['London', 'London', 'Paris', 'New York', 'Unknown'],
+            'country': ['UK', 'UK', 'France', 'USA', 'Unknown'],
+            'remote_preference': ['remote', 'onsite', 'remote', 'remote', 'remote']
+        }),
+        'skills': pd.DataFrame({'candidate_id': [0, 0, 1, 1, 2, 2, 3, 3, 4],
+                                'skill_name': ['Python', 'Django', 'Python', 'Flask', 'Python', 'Flask',
+                                               'Python', 'Django', 'Node.js']}),
+        'experience_technologies': pd.DataFrame({'experience_id': [0], 'candidate_id': [4], 'term_id': [0]}),
+        'experience_tools': pd.DataFrame({'experience_id': [0], 'candidate_id': [1], 'term_id': [1]}),
+        'vocabulary': pd.DataFrame({'term_id': [0, 1], 'term': ['Kafka', 'Git']})
+    }
+
+
+def search(query):
+    return CandidateIndex.from_tables(tables()).search(query).tolist()
+
+
+def test_tokenize_query():
+    assert tokenize_query('Python AND (Django OR Flask) in London, remote.') == [
+        ('TERM', 'Python'), 'AND', '(', ('TERM', 'Django'), 'OR', ('TERM', 'Flask'), ')',
+        'IN', ('TERM', 'London'), 'AND', ('TERM', 'remote')
+    ]
+
+
+def test_request_example():
+    assert search('Python AND (Django OR Flask) in London, remote') == [0]
+    assert search('python (django OR flask) remote') == [0, 2, 3]
+
+
+def test_in_matches_city_or_country_with_multi_word_places():
+    assert search('in UK') == [0, 1]
+    assert search('python in New York') == [3]
+    assert search('in London python') == [0, 1]
+    assert search('in "new york"') == [3]
+    assert search('in Berlin') == []
+
+
+def test_fields_not_and_punctuation():
+    assert search('skill:django OR tool:git') == [0, 1, 3]
+    assert search('city:"New York"') == [3]
+    assert search('NOT python') == [4]
+    assert search('node.js') == [4]
+    assert search('kafka.') == [4]
+    # Missing values aren't indexed
+    assert search('unknown') == []
+
+
+def test_index_round_trip(tmp_path):
+    index = CandidateIndex.from_tables(tables())
+    index.save(tmp_path / 'index.npz')
+    loaded = CandidateIndex.load(tmp_path / 'index.npz')
+    np.testing.assert_array_equal(loaded.search('python in london'), index.search('python in london'))
+
+
+@pytest.mark.parametrize('query', ['(python', 'python AND', 'in', 'python )'])
+def test_malformed_queries_raise(query):
+    with pytest.raises(ValueError):
+        search(query)
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import service
+
+
+def new_batcher(**options):
+    batcher = service.MicroBatcher(**options)
+    batcher.queue = asyncio.Queue(maxsize=batcher.max_queue)
+    return batcher
+
+
+async def request(port, method, target, body=b'', content_type='text/plain'):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"{method} {target} HTTP/1.1\r\nContent-Type: {content_type}\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split(b' ')[1]), json.loads(payload)
+
+
+def test_bad_json_bodies_get_400():
+    async def run():
+        resume_service = service.ResumeService(new_batcher())
+        for body in (b'{"text": 12345}', b'[1, 2]', b'"text"', b'{"other": "x"}', b'{'):
+            status, _ = await resume_service.route('POST', '/parse', {'content-type': 'application/json'}, body)
+            assert status == 400
+    asyncio.run(run())
+
+
+def test_corrupt_upload_gets_422_response():
+    async def run():
+        batcher = new_batcher()
+        batcher.extract_pool = batcher.new_extract_pool()
+        server = await asyncio.start_server(service.ResumeService(batcher).handle_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            for filename in ('a.pdf', 'a.docx'):
+                status, payload = await request(port, 'POST', f"/parse?filename={filename}", b'not a document')
+                assert status == 422 and filename in payload['error']
+        finally:
+            server.close()
+            batcher.extract_pool.shutdown()
+    asyncio.run(run())
+
+
+def test_broken_extract_pool_is_replaced():
+    async def run():
+        batcher = new_batcher()
+        batcher.extract_pool = broken = batcher.new_extract_pool()
+        with pytest.raises(BrokenProcessPool):
+            broken.submit(os._exit, 1).result()
+        with pytest.raises(service.ExtractionFailed):
+            await batcher.extract(b'hello', 'a.txt')
+        assert batcher.extract_pool is not broken
+        assert await batcher.extract(b'John  Smith', 'a.txt') == 'John Smith'
+        batcher.extract_pool.shutdown()
+    asyncio.run(run())
+
+
+def test_failed_batch_only_fails_the_bad_request(monkeypatch):
+    def parse_batch(texts):
+        if 'bad' in texts:
+            raise ValueError('bad text')
+        return [{'text': text} for text in texts]
+    monkeypatch.setattr(service, 'parse_batch', parse_batch)
+
+    async def run():
+        batcher = new_batcher(max_wait_ms=50)
+        batcher.pool = ThreadPoolExecutor(1)
+        task = asyncio.create_task(batcher.run_batches())
+        results = await asyncio.gather(*(batcher.submit(text) for text in ('a', 'bad', 'c')), return_exceptions=True)
+        task.cancel()
+        assert results[0] == {'text': 'a'} and results[2] == {'text': 'c'}
+        assert isinstance(results[1], ValueError)
+        assert batcher.metrics()['failed'] == 1
+    asyncio.run(run())
+
+
+def test_full_queue_gets_503():
+    async def run():
+        batcher = new_batcher(max_queue=1)
+        batcher.extracting = 1
+        status, _ = await service.ResumeService(batcher).route('POST', '/parse', {}, b'text')
+        assert status == 503
+    asyncio.run(run())
+
+
+def test_cached_text_and_upload_skip_the_pools(tmp_path, monkeypatch):
+    parsed = []
+    def parse_batch(texts):
+        parsed.extend(texts)
+        return [{'entities': {'NAME': [text]}, 'record': {}} for text in texts]
+    monkeypatch.setattr(service, 'parse_batch', parse_batch)
+
+    async def run():
+        batcher = new_batcher(max_wait_ms=1)
+        batcher.pool = ThreadPoolExecutor(1)
+        batcher.extract_pool = batcher.new_extract_pool()
+        batcher.cache = service.ResumeResultCache(str(tmp_path / 'cache.sqlite'))
+        task = asyncio.create_task(batcher.run_batches())
+        try:
+            for _ in range(2):
+                text = await batcher.extract(b'John  Smith', 'a.txt')
+                assert (await batcher.submit(text))['entities'] == {'NAME': ['John Smith']}
+        finally:
+            task.cancel()
+            batcher.extract_pool.shutdown()
+            batcher.cache.close()
+        assert parsed == ['John Smith']
+        assert batcher.metrics()['cache_hits'] == 2
+    asyncio.run(run())
@@ -0,0 +1,78 @@
+import json
+
+import pandas as pd
+import pytest
+
+from utils.tables import ResumeTables
+
+
+def record(i, gpa):
+    return {
+        'personal_info': {'name': f"Name {i}", 'email': 'Unknown', 'location': {'city': 'Pune'},
+                          'summary': f"Python developer number {i}"},
+        'experience': [{'company': f"Company {i % 3}", 'level': 'senior',
+                        'technical_environment': {'technologies': ['Python', 'SQL'], 'tools': ['Git']}}],
+        'education': [{'degree': {'level': 'BSc'}, 'achievements': {'gpa': gpa}}],
+        'skills': {'technical': {'programming_languages': [{'name': 'Python', 'level': 'expert'}]}}
+    }
+
+
+def write_jsonl(path, records, mode='w'):
+    with open(path, mode, encoding='utf-8') as file:
+        for item in records:
+            file.write(json.dumps(item) + '\n')
+
+
+def assert_same_tables(cached, fresh):
+    assert sorted(cached) == sorted(fresh)
+    for table in fresh:
+        pd.testing.assert_frame_equal(cached[table], fresh[table], check_categorical=False)
+
+
+GPAS = [3.5, '3.8/4.0', None, 4, 'Unknown']
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_cached_tables_equal_fresh_parse(tmp_path, compact):
+    source = tmp_path / 'resumes.jsonl'
+    write_jsonl(source, [record(i, GPAS[i % len(GPAS)]) for i in range(10)])
+    cache_dir = str(tmp_path / 'cache')
+
+    fresh = ResumeTables(str(source), compact=compact).df
+    ResumeTables(str(source), cache_dir=cache_dir, compact=compact)
+    assert_same_tables(ResumeTables(str(source), cache_dir=cache_dir, compact=compact).df, fresh)
+    gpa = fresh['educations']['gpa']
+    assert gpa.tolist()[:2] == ['3.5', '3.8/4.0'] and gpa.isna()[2]
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_refreshed_cache_equals_fresh_parse(tmp_path, compact):
+    source = tmp_path / 'resumes.jsonl'
+    records = [record(i, GPAS[i % len(GPAS)]) for i in range(12)]
+    write_jsonl(source, records[:5])
+    cache_dir = str(tmp_path / 'cache')
+
+    ResumeTables(str(source), cache_dir=cache_dir, compact=compact)
+    write_jsonl(source, records[5:], mode='a')
+    # Picks up the appended lines through the cache
+    cached = ResumeTables(str(source), cache_dir=cache_dir, compact=compact)
+    assert cached.record_count == 12
+    assert_same_tables(ResumeTables(str(source), cache_dir=cache_dir, compact=compact).df,
+                       ResumeTables(str(source), compact=compact).df)
+
+
+def test_compact_and_plain_caches_are_kept_apart(tmp_path, monkeypatch):
+    source = tmp_path / 'resumes.jsonl'
+    write_jsonl(source, [record(i, GPAS[i % len(GPAS)]) for i in range(6)])
+    cache_dir = str(tmp_path / 'cache')
+    ResumeTables(str(source), cache_dir=cache_dir, compact=False)
+    ResumeTables(str(source), cache_dir=cache_dir, compact=True)
+
+    # Both modes now open from their own cache without parsing the source again
+    def no_parse(self):
+        raise AssertionError('parsed the source instead of using the cache')
+    monkeypatch.setattr(ResumeTables, 'create_dataframes', no_parse)
+    for compact in (False, True):
+        tables = ResumeTables(str(source), cache_dir=cache_dir, compact=compact)
+        assert tables.cache.read_manifest()['compact'] == compact
+        assert len(tables.df['candidates']) == 6
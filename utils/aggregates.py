@@ -0,0 +1,155 @@
+import json
+import os
+
+import pandas as pd
+
+from utils.quality import PROFILED_TABLES
+
+
+AGGREGATES_VERSION = 1
+
+# Summary word-count bins of the candidates dashboard
+SUMMARY_WORD_BINS = [0, 5, 10, 15, 20, 30, 50, float('inf')]
+SUMMARY_WORD_LABELS = ['0-5', '6-10', '11-15', '16-20', '21-30', '31-50', '50+']
+
+
+def plain(value):
+    """numpy scalars as Python values, so they can be written as JSON"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def top_counts(values, sentinel, top_n):
+    """(counts of the top_n real values, number of missing values) of a column"""
+    missing = values.isna() | values.eq(sentinel).fillna(False).astype(bool)
+    counts = values[~missing].value_counts()
+    # Categoricals also count categories that don't occur
+    counts = counts[counts > 0].head(top_n)
+    return counts, int(missing.sum())
+
+
+def summary_word_counts(summaries, sentinel):
+    """How many summaries fall into each SUMMARY_WORD_BINS bin, missing summaries left out"""
+    summaries = summaries.dropna()
+    summaries = summaries[summaries != sentinel].astype(str)
+    words = summaries.str.split().str.len()
+    bins = pd.cut(words, bins=SUMMARY_WORD_BINS, labels=SUMMARY_WORD_LABELS, right=True)
+    return bins.value_counts().reindex(SUMMARY_WORD_LABELS, fill_value=0)
+
+
+class DashboardAggregates:
+
+    """
+
+    Everything the dashboards plot, computed once per data refresh: the top_n values and the
+    missing count of every column of the main tables, skill names per skill type, technology and
+    tool counts, summary word-count bins and completeness. Saved as one small JSON file.
+
+    """
+
+    def __init__(self, counts, missing, summary_words, completeness, top_n, stamp=None):
+        # counts: DataFrame of table, column, group, value, count, most common first per column
+        self.counts = counts
+        self.missing = missing
+        self.summary_words = summary_words
+        self.completeness = completeness
+        self.top_n = top_n
+        self.stamp = stamp
+
+    @classmethod
+    def build(cls, tables, profile, sentinel='Unknown', top_n=25, technology_counts=None, stamp=None):
+        """
+        Aggregate DataframesFromJSONL/ResumeTables tables. profile is their quality_profile and
+        technology_counts a function of the link table name, like ResumeTables.technology_counts.
+        """
+        rows = []
+        missing = {}
+        for table in PROFILED_TABLES:
+            df = tables[table]
+            for column in df.columns:
+                if column.endswith('_id') or column == 'summary':
+                    continue
+                counts, missing[(table, column)] = top_counts(df[column], sentinel, top_n)
+                rows.extend((table, column, None, plain(value), int(count)) for value, count in counts.items())
+
+        # Skill names per skill type, e.g. the top programming languages
+        skills = tables['skills']
+        for skill_type, names in skills.groupby(skills['skill_type'].astype(object), sort=False)['skill_name']:
+            counts, _ = top_counts(names, sentinel, top_n)
+            rows.extend(('skills', 'skill_name', skill_type, plain(value), int(count)) for value, count in counts.items())
+
+        if technology_counts is not None:
+            for table in ('experience_technologies', 'experience_tools'):
+                counts = technology_counts(table).head(top_n)
+                rows.extend((table, 'term', None, plain(value), int(count)) for value, count in counts.items())
+
+        return cls(
+            pd.DataFrame(rows, columns=['table', 'column', 'group', 'value', 'count']),
+            missing,
+            summary_word_counts(tables['candidates']['summary'], sentinel),
+            profile['completeness'],
+            top_n,
+            stamp
+        )
+
+    def save(self, path):
+        """Write the aggregates to a JSON file, atomically"""
+        data = {
+            'version': AGGREGATES_VERSION,
+            'stamp': self.stamp,
+            'top_n': self.top_n,
+            'counts': self.counts.values.tolist(),
+            'missing': [[table, column, count] for (table, column), count in self.missing.items()],
+            'summary_words': [[label, int(count)] for label, count in self.summary_words.items()],
+            'completeness': [[table, column, float(ratio)] for (table, column), ratio in self.completeness.items()]
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, default=plain)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, stamp=None):
+        """Aggregates saved at path, None if missing, outdated or saved for another stamp"""
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != AGGREGATES_VERSION or (stamp is not None and data.get('stamp') != stamp):
+            return None
+
+        completeness = pd.Series(
+            [ratio for _, _, ratio in data['completeness']],
+            index=pd.MultiIndex.from_tuples([(table, column) for table, column, _ in data['completeness']],
+                                            names=['table', 'column']),
+            name='completeness'
+        )
+        return cls(
+            pd.DataFrame(data['counts'], columns=['table', 'column', 'group', 'value', 'count']),
+            {(table, column): count for table, column, count in data['missing']},
+            pd.Series(dict(data['summary_words']), name='count'),
+            completeness,
+            data['top_n'],
+            data['stamp']
+        )
+
+    def top(self, table, column, n=10, group=None, include_missing=False, sentinel='Unknown'):
+        """
+        value -> count Series of the n most common values of a column (n=None for all stored),
+        like value_counts().head(n). include_missing counts missing values as sentinel.
+        """
+        if n is not None and n > self.top_n:
+            raise ValueError(f"Only the top {self.top_n} values are aggregated, asked for {n}")
+        counts = self.counts
+        selected = (counts['table'] == table) & (counts['column'] == column)
+        selected &= counts['group'].isna() if group is None else counts['group'] == group
+        result = pd.Series(counts.loc[selected, 'count'].to_numpy(), index=counts.loc[selected, 'value'].to_numpy(),
+                           name='count')
+        if include_missing and self.missing.get((table, column)):
+            result = pd.concat([result, pd.Series({sentinel: self.missing[(table, column)]}, name='count')])
+            result = result.sort_values(ascending=False, kind='stable')
+        return result if n is None else result.head(n)
+
+    def columns(self, table):
+        """The aggregated columns of a table, in table order"""
+        return [column for (name, column) in self.missing if name == table]
@@ -0,0 +1,152 @@
+import os
+import pickle
+
+import spacy
+from spacy.tokens import Doc, DocBin, Span
+from spacy.training import Example
+from spacy.util import filter_spans
+
+
+TRAIN_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'train_data.pkl')
+
+
+def load_train_data(path=TRAIN_DATA_PATH):
+    """The pickled list of (text, {'entities': [(start, end, label), ...]}) tuples"""
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+
+def trim_span(text, start, end):
+    """Move start/end inwards past whitespace, spaCy can't learn entities with leading/trailing spaces"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def strip_space_tokens(span):
+    """Span without leading/trailing whitespace tokens (e.g. the token for a double space), None if nothing is left"""
+    start, end = span.start, span.end
+    while start < end and span.doc[start].is_space:
+        start += 1
+    while end > start and span.doc[end - 1].is_space:
+        end -= 1
+    if start == end:
+        return None
+    return Span(span.doc, start, end, label=span.label_)
+
+
+def entities_to_spans(doc, entities, report):
+    """
+    Validated entity Spans for a Doc.
+
+    Offsets are trimmed of whitespace and snapped to token boundaries. Spans that still don't
+    line up with tokens are dropped, and of overlapping spans the longest is kept. Every
+    adjustment is counted in report.
+    """
+    spans = []
+    for start, end, label in entities:
+        trimmed_start, trimmed_end = trim_span(doc.text, start, end)
+        if (trimmed_start, trimmed_end) != (start, end):
+            report['trimmed'] += 1
+        if trimmed_start >= trimmed_end:
+            report['empty'] += 1
+            continue
+
+        span = doc.char_span(trimmed_start, trimmed_end, label=label)
+        if span is None:
+            span = doc.char_span(trimmed_start, trimmed_end, label=label, alignment_mode='contract')
+            if span is None or not span.text.strip():
+                report['misaligned'] += 1
+                report['misaligned_examples'].append((doc.text[trimmed_start:trimmed_end], label))
+                continue
+            report['contracted'] += 1
+        span = strip_space_tokens(span)
+        if span is None:
+            report['empty'] += 1
+            continue
+        spans.append(span)
+
+    kept = filter_spans(spans)
+    report['overlapping'] += len(spans) - len(kept)
+    report['entities'] += len(kept)
+    return kept
+
+
+def build_docbin(train_data, output_path, shard_size=None, lang='en'):
+    """
+    Validate the entity offsets of train_data once and serialize it to spaCy's binary DocBin format.
+
+    With shard_size, output_path is a directory of numbered .spacy files of at most shard_size
+    docs each, which iter_corpus streams one at a time. Returns a report of the fixes made.
+    """
+    nlp = spacy.blank(lang)
+    report = {'docs': 0, 'entities': 0, 'trimmed': 0, 'contracted': 0, 'empty': 0,
+              'misaligned': 0, 'overlapping': 0, 'misaligned_examples': []}
+
+    if shard_size:
+        os.makedirs(output_path, exist_ok=True)
+
+    def write(doc_bin, shard):
+        path = os.path.join(output_path, f"{shard:05d}.spacy") if shard_size else output_path
+        doc_bin.to_disk(path)
+
+    doc_bin = DocBin(attrs=['ENT_IOB', 'ENT_TYPE'])
+    shard = 0
+    for text, annotations in train_data:
+        doc = nlp.make_doc(text)
+        doc.ents = entities_to_spans(doc, annotations.get('entities', []), report)
+        doc_bin.add(doc)
+        report['docs'] += 1
+
+        if shard_size and len(doc_bin) >= shard_size:
+            write(doc_bin, shard)
+            doc_bin = DocBin(attrs=['ENT_IOB', 'ENT_TYPE'])
+            shard += 1
+
+    if len(doc_bin) or not shard_size:
+        write(doc_bin, shard)
+
+    print(f"Wrote {report['docs']} docs with {report['entities']} entities to {output_path} "
+          f"({report['trimmed']} trimmed, {report['contracted']} snapped to tokens, "
+          f"{report['misaligned']} misaligned and {report['overlapping']} overlapping dropped)")
+    return report
+
+
+def corpus_files(path):
+    """The .spacy file, or the sorted .spacy shards of a directory"""
+    if os.path.isdir(path):
+        return [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith('.spacy')]
+    return [path]
+
+
+def examples_from_docbin(doc_bin, nlp):
+    """
+    Examples for the reference docs of a DocBin.
+
+    The predicted Doc is rebuilt from the stored tokens instead of running the tokenizer again.
+    """
+    for reference in doc_bin.get_docs(nlp.vocab):
+        words = [token.text for token in reference]
+        spaces = [bool(token.whitespace_) for token in reference]
+        yield Example(Doc(nlp.vocab, words=words, spaces=spaces), reference)
+
+
+def iter_corpus(path, nlp):
+    """Stream Examples from a .spacy file or directory of shards, one shard in memory at a time"""
+    for file_path in corpus_files(path):
+        yield from examples_from_docbin(DocBin().from_disk(file_path), nlp)
+
+
+def examples_to_bytes(examples):
+    """Serialize the reference docs of Examples, e.g. to send a shard to another process"""
+    doc_bin = DocBin(attrs=['ENT_IOB', 'ENT_TYPE'])
+    for example in examples:
+        doc_bin.add(example.reference)
+    return doc_bin.to_bytes()
+
+
+def examples_from_bytes(data, nlp):
+    """Examples back from examples_to_bytes"""
+    return list(examples_from_docbin(DocBin().from_bytes(data), nlp))
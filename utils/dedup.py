@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+
+# Candidate columns a usable row must have a real value in, and the values that don't count
+CLEAN_COLUMNS = ['name', 'email', 'summary', 'phone', 'city', 'country', 'remote_preference', 'linkedin', 'github']
+UNWANTED_VALUES = ['Unknown', 'Not Provided', '', 'no']
+
+# Columns that are expected to repeat across candidates, all others must be unique
+DUPLICATE_EXCEPTIONS = ['city', 'country', 'remote_preference', 'summary']
+
+
+def first_occurrences(codes):
+    """Boolean mask of the first row of every distinct code"""
+    first = np.zeros(len(codes), dtype=bool)
+    first[np.unique(codes, return_index=True)[1]] = True
+    return first
+
+
+def dedup_candidates(candidates, clean_columns=CLEAN_COLUMNS, unwanted_values=UNWANTED_VALUES,
+                     exceptions=DUPLICATE_EXCEPTIONS, shared_summaries=True):
+    """
+    The cleaning of data_exploration.ipynb as a single stage. Returns (kept_candidates, report).
+
+    Drops candidates with a null or unwanted value in any of clean_columns, then (with
+    shared_summaries) those whose summary no other remaining candidate has, then every candidate
+    repeating an earlier candidate's value in a column outside exceptions.
+
+    Every column is factorized (hashed) once and the masks are combined on the integer codes,
+    so the frame is only copied for the result. Unlike the notebook's drop_duplicates loop,
+    all duplicate masks are computed on the same rows, so the result doesn't depend on the
+    column order.
+    """
+    columns = [col for col in candidates.columns if not col.endswith('_id')]
+    codes = {col: pd.factorize(candidates[col])[0] for col in columns}
+
+    # Null values factorize to -1
+    unwanted = np.zeros(len(candidates), dtype=bool)
+    for col in clean_columns:
+        unwanted |= (codes[col] == -1) | candidates[col].isin(unwanted_values).to_numpy()
+    keep = ~unwanted
+
+    unique_summary = np.zeros(len(candidates), dtype=bool)
+    if shared_summaries:
+        summary_codes = codes['summary']
+        counts = np.bincount(summary_codes[keep & (summary_codes >= 0)], minlength=int(summary_codes.max(initial=0)) + 1)
+        unique_summary = keep & ((summary_codes < 0) | (counts[summary_codes] < 2))
+        keep &= ~unique_summary
+
+    # Duplicate masks of all checked columns over the same remaining rows, applied together
+    rows = np.flatnonzero(keep)
+    duplicate_masks = {}
+    for col in columns:
+        if col in exceptions:
+            continue
+        duplicate = np.zeros(len(candidates), dtype=bool)
+        duplicate[rows] = ~first_occurrences(codes[col][rows])
+        duplicate_masks[col] = duplicate
+    duplicated = np.logical_or.reduce(list(duplicate_masks.values())) if duplicate_masks else np.zeros(len(candidates), dtype=bool)
+    keep &= ~duplicated
+
+    report = {
+        'rows': len(candidates),
+        'unwanted': int(unwanted.sum()),
+        'unique_summary': int(unique_summary.sum()),
+        'duplicated': int(duplicated.sum()),
+        # A row can repeat values in several columns, so these can add up to more than 'duplicated'
+        'duplicates_per_column': {col: int(mask.sum()) for col, mask in duplicate_masks.items()},
+        'kept': int(keep.sum())
+    }
+    return candidates[keep], report
+
+
+def print_dedup_report(report):
+    print(f"Rows with unwanted values: {report['unwanted']}")
+    print(f"Rows with a summary no other candidate has: {report['unique_summary']}")
+    for col, count in report['duplicates_per_column'].items():
+        print(f"Column '{col}': {count} duplicates")
+    print(f"Total rows: {report['rows']} -> {report['kept']}")
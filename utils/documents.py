@@ -0,0 +1,134 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+
+# Formats picked up when scanning a directory. Plain text is opt-in (include_txt): data/ also
+# holds train_data.txt, the training dump, which is not a resume
+RESUME_EXTENSIONS = ('.pdf', '.docx')
+TEXT_EXTENSIONS = ('.txt',)
+
+INLINE_SPACE = re.compile(r'[ \t\xa0\u200b]+')
+LONG_GAP = re.compile(r' {3,}')
+
+
+def resume_extensions(include_txt=False):
+    return RESUME_EXTENSIONS + TEXT_EXTENSIONS if include_txt else RESUME_EXTENSIONS
+
+
+def iter_resume_files(directory, extensions=RESUME_EXTENSIONS):
+    """Yield the paths of resume files under directory, in a stable order (.pdf/.docx by default)"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(extensions):
+                yield os.path.join(root, name)
+
+
+def normalize_whitespace(text):
+    """
+    Flatten text to one line the way data/train_data.txt is formatted.
+
+    Lines are stripped and joined with a single space, so a blank line between
+    paragraphs becomes a double space, and runs of spaces inside a line collapse to one.
+    """
+    lines = [INLINE_SPACE.sub(' ', line).strip() for line in text.splitlines()]
+    return LONG_GAP.sub('  ', ' '.join(lines)).strip()
+
+
+def pdf_text(path):
+    """Raw text of a PDF"""
+    from pdfminer.high_level import extract_text
+    return extract_text(path)
+
+
+def docx_text(path):
+    """Raw text of a DOCX, paragraphs first then table cells"""
+    import docx
+    document = docx.Document(path)
+    lines = [paragraph.text for paragraph in document.paragraphs]
+    for table in document.tables:
+        for row in table.rows:
+            lines.extend(cell.text for cell in row.cells)
+    return '\n'.join(lines)
+
+
+def txt_text(path):
+    """Raw text of a plain text file"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as file:
+        return file.read()
+
+
+READERS = {
+    '.pdf': pdf_text,
+    '.docx': docx_text,
+    '.txt': txt_text
+}
+
+
+def extract_text(path):
+    """Normalized text of a .pdf, .docx or .txt resume"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in READERS:
+        raise ValueError(f"Unsupported resume format: {path}")
+    return normalize_whitespace(READERS[extension](path))
+
+
+def extract_texts(paths, n_workers=None, max_pending=None, pool=None):
+    """
+    Extract the text of many files in a process pool, yielding (path, text) as files finish.
+
+    paths is consumed lazily and at most max_pending files (default 4 per worker) are in
+    flight, so memory stays bounded however many files there are. Files that fail to
+    extract are reported and yielded with text None. Pass pool to reuse a running
+    ProcessPoolExecutor across calls, otherwise one with n_workers processes is started.
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    if pool is None:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            yield from extract_texts(paths, n_workers, max_pending, pool)
+        return
+
+    max_pending = max_pending or 4 * n_workers
+    paths = iter(paths)
+    pending = {}
+    while True:
+        for path in paths:
+            pending[pool.submit(extract_text, path)] = path
+            if len(pending) >= max_pending:
+                break
+        if not pending:
+            break
+
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            path = pending.pop(future)
+            try:
+                yield path, future.result()
+            except Exception as e:
+                print(f"Error extracting: {path} - {e}")
+                yield path, None
+
+
+def stream_entities(directory, extractor=None, n_workers=None, batch_size=None):
+    """
+    Walk directory, extract every resume in a process pool and stream the texts straight
+    into NER. Yields (path, text, entities).
+    """
+    if extractor is None:
+        from utils.ner import ResumeEntityExtractor
+        extractor = ResumeEntityExtractor()
+
+    texts = (
+        (text, path)
+        for path, text in extract_texts(iter_resume_files(directory), n_workers=n_workers)
+        if text
+    )
+    docs = extractor.nlp.pipe(
+        texts,
+        as_tuples=True,
+        batch_size=batch_size or extractor.batch_size,
+        n_process=extractor.n_process
+    )
+    for doc, path in docs:
+        yield path, doc.text, extractor.entities_from_doc(doc)
@@ -0,0 +1,154 @@
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+
+
+# Mersenne prime for the universal hashes, a * x + b stays below 2**62 so int64 doesn't overflow
+MERSENNE_PRIME = (1 << 31) - 1
+
+WORD = re.compile(r'\w+')
+
+
+def shingles(text, size=3):
+    """Distinct word size-grams of a lower-cased text as 32-bit crc32 hashes"""
+    words = WORD.findall(text.lower())
+    if not words:
+        return np.empty(0, dtype=np.int64)
+    grams = {' '.join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+    return np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams), dtype=np.int64, count=len(grams))
+
+
+class MinHashLSH:
+
+    """
+
+    Near-duplicate detection with MinHash signatures and banded locality-sensitive hashing.
+
+    Every text gets num_perm min-hashes of its word shingles. Signatures are split into bands
+    of num_perm // bands rows and only texts sharing a whole band are compared, so finding the
+    pairs takes about linear time instead of all-pairs. Pairs with a Jaccard similarity around
+    (1 / bands) ** (bands / num_perm) and above are likely to share a band.
+
+    """
+
+    def __init__(self, num_perm=128, bands=32, shingle_size=3, seed=1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.int64)
+        self.b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.int64)
+
+    def signature(self, text):
+        """num_perm min-hashes of a text, all MERSENNE_PRIME for a text without words"""
+        hashes = shingles(text, self.shingle_size) % MERSENNE_PRIME
+        if not len(hashes):
+            return np.full(self.num_perm, MERSENNE_PRIME, dtype=np.int64)
+        # (num_perm, n_shingles) permuted hashes, reduced to their minimum per permutation
+        return ((np.outer(self.a, hashes) + self.b[:, None]) % MERSENNE_PRIME).min(axis=1)
+
+    def signatures(self, texts):
+        """(n_texts, num_perm) signature matrix"""
+        texts = list(texts)
+        matrix = np.empty((len(texts), self.num_perm), dtype=np.int64)
+        for i, text in enumerate(texts):
+            matrix[i] = self.signature(text if isinstance(text, str) else '')
+        return matrix
+
+    def candidate_pairs(self, signatures):
+        """(i, j) row pairs with i < j that share at least one band"""
+        n = len(signatures)
+        # Texts without words have no signature to compare
+        has_words = signatures[:, 0] != MERSENNE_PRIME
+        codes = np.empty(0, dtype=np.int64)
+        for band in range(self.bands):
+            columns = signatures[:, band * self.rows:(band + 1) * self.rows]
+            # Hash every band row to a bucket id
+            _, buckets = np.unique(np.ascontiguousarray(columns).view(f"V{columns.itemsize * self.rows}"),
+                                   return_inverse=True)
+            buckets = buckets.ravel()
+            order = np.argsort(buckets, kind='stable')
+            order = order[has_words[order]]
+            starts = np.flatnonzero(np.diff(buckets[order], prepend=-1))
+            sizes = np.diff(np.append(starts, len(order)))
+            pair_codes = [codes]
+            for start, size in zip(starts[sizes > 1], sizes[sizes > 1]):
+                members = order[start:start + size]
+                i, j = np.triu_indices(size, k=1)
+                pair_codes.append(members[i].astype(np.int64) * n + members[j])
+            # Deduplicated per band, so a pair found in every band is only held once
+            codes = np.unique(np.concatenate(pair_codes))
+
+        return np.column_stack((codes // n, codes % n))
+
+    def near_duplicates(self, texts, keys=None, threshold=0.8):
+        """
+        Pairs of near-duplicate texts as a DataFrame of key_a, key_b and the estimated
+        Jaccard similarity of their shingles, most similar first. keys default to positions.
+
+        Exact copies are collapsed before hashing: every copy is paired once with the first
+        occurrence of its text (similarity 1.0), so a text repeated k times gives k - 1 pairs
+        rather than k * (k - 1) / 2. duplicate_groups turns the pairs into complete groups.
+        """
+        texts = pd.Series([text if isinstance(text, str) else '' for text in texts], dtype=object)
+        keys = np.arange(len(texts)) if keys is None else np.asarray(keys)
+        text_ids, unique_texts = pd.factorize(texts)
+        # Ids are numbered by first appearance, so first[text_id] is increasing
+        first = np.unique(text_ids, return_index=True)[1]
+
+        signatures = self.signatures(unique_texts)
+        pairs = self.candidate_pairs(signatures)
+        similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+        found = similarity >= threshold
+
+        has_words = signatures[:, 0] != MERSENNE_PRIME
+        copies = np.flatnonzero((np.arange(len(texts)) != first[text_ids]) & has_words[text_ids])
+        return pd.DataFrame({
+            'key_a': np.concatenate((keys[first[pairs[found, 0]]], keys[first[text_ids[copies]]])),
+            'key_b': np.concatenate((keys[first[pairs[found, 1]]], keys[copies])),
+            'similarity': np.concatenate((similarity[found], np.ones(len(copies))))
+        }).sort_values('similarity', ascending=False, kind='stable', ignore_index=True)
+
+
+def duplicate_groups(pairs):
+    """Connected groups of keys from near_duplicates pairs, as a Series of group number by key"""
+    keys, codes = np.unique(np.concatenate((pairs['key_a'], pairs['key_b'])), return_inverse=True)
+    parent = np.arange(len(keys))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    half = len(pairs)
+    for a, b in zip(codes[:half], codes[half:]):
+        parent[root(a)] = root(b)
+    roots = np.array([root(i) for i in range(len(keys))], dtype=np.int64)
+    return pd.Series(np.unique(roots, return_inverse=True)[1], index=keys, name='group')
+
+
+def near_duplicate_summaries(candidates, threshold=0.8, lsh=None, sentinel='Unknown'):
+    """Near-duplicate candidate summaries as pairs of candidate_ids, missing summaries left out"""
+    lsh = lsh or MinHashLSH()
+    summaries = candidates['summary']
+    filled = summaries.notna() & (summaries.astype(object) != sentinel) & (summaries.astype(object) != '')
+    filled = filled.to_numpy(dtype=bool)
+    return lsh.near_duplicates(summaries[filled].astype(object).to_numpy(),
+                               candidates['candidate_id'].to_numpy()[filled], threshold)
+
+
+def near_duplicate_files(items, threshold=0.8, lsh=None):
+    """Near-duplicate resumes from (path, text) pairs, e.g. from utils.documents.extract_texts"""
+    paths, texts = [], []
+    for path, text in items:
+        if text:
+            paths.append(path)
+            texts.append(text)
+    lsh = lsh or MinHashLSH(shingle_size=5)
+    return lsh.near_duplicates(texts, paths, threshold)
@@ -0,0 +1,156 @@
+import json
+import os
+from itertools import groupby
+
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nlp_ner_model')
+
+# Window break points, best first: section breaks (a blank line becomes a double space in
+# normalized text), sentence ends, then any space
+BREAKS = ('\n', '  ', '. ', ' ')
+
+
+def model_labels(model_path=MODEL_PATH):
+    """The NER labels listed in a trained pipeline's meta.json"""
+    with open(os.path.join(model_path, 'meta.json'), 'r', encoding='utf-8') as file:
+        return json.load(file)['labels']['ner']
+
+
+def split_windows(text, max_chars=2000, overlap=200):
+    """
+    (start, end) character windows of at most max_chars covering text, each overlapping
+    the previous one by about overlap characters.
+
+    Windows end at the best break point in their second half and start on a word boundary,
+    so an entity is only cut by a window edge if it is longer than the overlap.
+    """
+    windows = []
+    start = 0
+    while True:
+        end = start + max_chars
+        if end >= len(text):
+            windows.append((start, len(text)))
+            return windows
+
+        for separator in BREAKS:
+            cut = text.rfind(separator, start + max_chars // 2, end)
+            if cut != -1:
+                end = cut + len(separator)
+                break
+        windows.append((start, end))
+
+        # Back up by the overlap to the start of a word, always moving forward
+        next_start = text.find(' ', end - overlap, end)
+        next_start = end - overlap if next_start == -1 else next_start + 1
+        start = max(next_start, start + 1)
+
+
+def merge_window_spans(spans):
+    """
+    Document-level entities from the (start, end, label, margin) spans of overlapping windows.
+
+    Where spans from different windows overlap, the one furthest from its window's edges
+    (with the most context) is kept. Returns sorted (start, end, label) tuples.
+    """
+    kept = []
+    taken = []
+    for start, end, label, margin in sorted(spans, key=lambda span: (-span[3], span[0])):
+        if any(start < other_end and other_start < end for other_start, other_end in taken):
+            continue
+        taken.append((start, end))
+        kept.append((start, end, label))
+    return sorted(kept)
+
+
+class ResumeEntityExtractor:
+
+    """
+
+    Loads the trained NER pipeline once and streams resume texts through nlp.pipe.
+
+    """
+
+    def __init__(self, model_path=MODEL_PATH, batch_size=64, n_process=1, rule_labels=None):
+        # Imported here so modules that only need MODEL_PATH (e.g. the result cache) don't load spaCy
+        import spacy
+        self.nlp = spacy.load(model_path)
+        if rule_labels:
+            # Regex pre-pass for near-deterministic labels, see utils.rules
+            from utils.rules import add_rule_pipes
+            add_rule_pipes(self.nlp, rule_labels)
+        self.labels = list(self.nlp.get_pipe('ner').labels)
+        self.batch_size = batch_size
+        self.n_process = n_process
+
+    def entities_from_doc(self, doc):
+        """Group the entity texts of a Doc by label, e.g. {'Name': ['Alice Clark'], ...}"""
+        entities = {label: [] for label in self.labels}
+        for ent in doc.ents:
+            entities.setdefault(ent.label_, []).append(ent.text)
+        return entities
+
+    def extract(self, texts, batch_size=None, n_process=None):
+        """Yield one entity dict per text, in input order"""
+        docs = self.nlp.pipe(
+            texts,
+            batch_size=batch_size or self.batch_size,
+            n_process=n_process or self.n_process
+        )
+        for doc in docs:
+            yield self.entities_from_doc(doc)
+
+    def extract_with_context(self, items, batch_size=None, n_process=None):
+        """Yield (entities, context) for (text, context) pairs, e.g. (text, file_path)"""
+        docs = self.nlp.pipe(
+            items,
+            as_tuples=True,
+            batch_size=batch_size or self.batch_size,
+            n_process=n_process or self.n_process
+        )
+        for doc, context in docs:
+            yield self.entities_from_doc(doc), context
+
+    def extract_one(self, text):
+        """Entity dict for a single text"""
+        return self.entities_from_doc(self.nlp(text))
+
+    def extract_chunked_spans(self, texts, max_chars=2000, overlap=200, batch_size=None, n_process=None):
+        """
+        Yield the (start, end, label) entities of every text, in input order, running the model
+        over overlapping windows of at most max_chars instead of the whole text.
+
+        Memory and time per model call stay bounded however long a document is, and windows of
+        all documents are batched together through nlp.pipe.
+        """
+        def windows():
+            for i, text in enumerate(texts):
+                for start, end in split_windows(text, max_chars, overlap):
+                    yield text[start:end], (i, start, end, len(text))
+
+        docs = self.nlp.pipe(
+            windows(),
+            as_tuples=True,
+            batch_size=batch_size or self.batch_size,
+            n_process=n_process or self.n_process
+        )
+        # Windows come back in order, so consecutive windows of a document form a group
+        for _, group in groupby(docs, key=lambda item: item[1][0]):
+            spans = []
+            for doc, (_, window_start, window_end, length) in group:
+                for ent in doc.ents:
+                    start, end = window_start + ent.start_char, window_start + ent.end_char
+                    # Distance to a window edge that cuts the text, document edges don't count
+                    left = start - window_start if window_start > 0 else length
+                    right = window_end - end if window_end < length else length
+                    spans.append((start, end, ent.label_, min(left, right)))
+            yield merge_window_spans(spans)
+
+    def extract_chunked(self, texts, max_chars=2000, overlap=200, batch_size=None, n_process=None):
+        """Like extract, but through extract_chunked_spans for long documents"""
+        texts = list(texts)
+        spans = self.extract_chunked_spans(texts, max_chars, overlap, batch_size, n_process)
+        for text, text_spans in zip(texts, spans):
+            entities = {label: [] for label in self.labels}
+            for start, end, label in text_spans:
+                entities.setdefault(label, []).append(text[start:end])
+            yield entities
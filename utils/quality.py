@@ -0,0 +1,49 @@
+import pandas as pd
+
+
+# Tables the data-quality profile covers
+PROFILED_TABLES = ['candidates', 'experiences', 'educations', 'skills']
+
+PROFILE_COLUMNS = ['rows', 'nulls', 'sentinels', 'distinct', 'completeness']
+
+
+def profile_table(df, sentinel='Unknown'):
+    """
+    Per-column null, sentinel and distinct counts plus completeness for one table.
+
+    Sentinels are cells exactly equal to sentinel, so a summary that merely mentions
+    "Unknown" still counts as filled in. Id columns are left out.
+    """
+    df = df[[col for col in df.columns if not col.endswith('_id')]]
+    rows = len(df)
+
+    is_sentinel = df.eq(sentinel).fillna(False).astype(bool)
+    nulls = df.isna().sum()
+    sentinels = is_sentinel.sum()
+    # Distinct real values, the sentinel is not one
+    distinct = df.mask(is_sentinel).nunique()
+    missing = nulls + sentinels
+    completeness = 1 - missing / rows if rows else pd.Series(1.0, index=df.columns)
+
+    return pd.DataFrame({
+        'rows': rows,
+        'nulls': nulls,
+        'sentinels': sentinels,
+        'distinct': distinct,
+        'completeness': completeness
+    }, index=df.columns, columns=PROFILE_COLUMNS)
+
+
+def profile_tables(dataframes, tables=PROFILED_TABLES, sentinel='Unknown'):
+    """Profile of every table, indexed by (table, column)"""
+    profiles = {table: profile_table(dataframes[table], sentinel) for table in tables if table in dataframes}
+    if not profiles:
+        return pd.DataFrame(columns=PROFILE_COLUMNS)
+    profile = pd.concat(profiles, names=['table', 'column'])
+    return profile
+
+
+def table_completeness(profile):
+    """Share of non-missing cells per table"""
+    totals = profile.groupby(level='table', sort=False)[['rows', 'nulls', 'sentinels']].sum()
+    return 1 - (totals['nulls'] + totals['sentinels']) / totals['rows']
@@ -0,0 +1,132 @@
+import re
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+# Keeps tokens like 'c++', 'c#' and 'node.js' in one piece
+TOKEN = r'[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]'
+TOKEN_PATTERN = re.compile(TOKEN)
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def candidate_documents(tables):
+    """(candidate_id, text) pairs: one row per skill, technology, tool and summary of a candidate"""
+    parts = [
+        tables['skills'][['candidate_id', 'skill_name']].set_axis(['candidate_id', 'text'], axis=1),
+        tables['candidates'][['candidate_id', 'summary']].set_axis(['candidate_id', 'text'], axis=1)
+    ]
+    terms = tables['vocabulary']['term'].to_numpy()
+    for table in ('experience_technologies', 'experience_tools'):
+        links = tables[table]
+        parts.append(pd.DataFrame({'candidate_id': links['candidate_id'].to_numpy(),
+                                   'text': terms[links['term_id'].to_numpy()]}))
+    documents = pd.concat([part.astype({'text': object}) for part in parts], ignore_index=True)
+    return documents[documents['text'].notna() & (documents['text'] != 'Unknown')]
+
+
+class RankingIndex:
+
+    """
+
+    Ranks candidates against a job description with BM25 (default) or TF-IDF cosine scores over
+    the words of their skills, technologies, tools and summary.
+
+    The weighted candidate x term matrix is computed once, so a ranking is one sparse
+    matrix-vector product plus an argpartition for the top k. The index persists to one .npz file.
+
+    """
+
+    def __init__(self, matrix, vocabulary, idf, candidate_ids, scoring='bm25'):
+        self.matrix = matrix
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.candidate_ids = candidate_ids
+        self.scoring = scoring
+
+    @classmethod
+    def from_tables(cls, tables, scoring='bm25', k1=1.2, b=0.75):
+        """Build the index from DataframesFromJSONL/ResumeTables tables"""
+        if scoring not in ('bm25', 'tfidf'):
+            raise ValueError(f"Unknown scoring: {scoring}")
+        documents = candidate_documents(tables)
+        candidate_ids, rows = np.unique(documents['candidate_id'].to_numpy(), return_inverse=True)
+
+        tokens = documents['text'].str.lower().str.findall(TOKEN)
+        counts = tokens.str.len().to_numpy()
+        tokens = tokens.explode().dropna()
+        columns, vocabulary = pd.factorize(tokens.to_numpy(), sort=True)
+        row_of_token = np.repeat(rows, counts)
+
+        # Duplicate (row, column) entries are summed into term frequencies
+        tf = sparse.csr_matrix(
+            (np.ones(len(columns), dtype=np.float32), (row_of_token, columns)),
+            shape=(len(candidate_ids), len(vocabulary))
+        )
+        tf.sum_duplicates()
+
+        n_docs = tf.shape[0]
+        df = np.bincount(tf.indices, minlength=tf.shape[1])
+        if scoring == 'bm25':
+            idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+            lengths = np.asarray(tf.sum(axis=1)).ravel()
+            norm = k1 * (1 - b + b * lengths / max(lengths.mean(), 1))
+            row_norm = np.repeat(norm, np.diff(tf.indptr))
+            tf.data = idf[tf.indices] * tf.data * (k1 + 1) / (tf.data + row_norm)
+        else:
+            idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+            tf.data = (1 + np.log(tf.data)) * idf[tf.indices]
+            row_norm = np.sqrt(np.asarray(tf.multiply(tf).sum(axis=1)).ravel())
+            tf.data /= np.repeat(np.maximum(row_norm, 1e-12), np.diff(tf.indptr))
+        tf.data = tf.data.astype(np.float32)
+
+        return cls(tf, np.asarray(vocabulary, dtype=str), idf, candidate_ids.astype(np.int64), scoring)
+
+    def save(self, path):
+        """Write the index to an .npz file"""
+        np.savez(path, data=self.matrix.data, indices=self.matrix.indices, indptr=self.matrix.indptr,
+                 shape=np.array(self.matrix.shape), vocabulary=self.vocabulary, idf=self.idf,
+                 candidate_ids=self.candidate_ids, scoring=np.array(self.scoring))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            matrix = sparse.csr_matrix((data['data'], data['indices'], data['indptr']), shape=tuple(data['shape']))
+            return cls(matrix, data['vocabulary'], data['idf'], data['candidate_ids'], str(data['scoring']))
+
+    def query_vector(self, text):
+        """Sparse vocabulary x 1 vector of a job description, terms outside the vocabulary are ignored"""
+        tokens, counts = np.unique(tokenize(text), return_counts=True)
+        positions = np.searchsorted(self.vocabulary, tokens)
+        positions = np.minimum(positions, len(self.vocabulary) - 1)
+        known = self.vocabulary[positions] == tokens
+        columns, counts = positions[known], counts[known].astype(np.float32)
+
+        if self.scoring == 'bm25':
+            # Document weights already include the idf, every query term counts once
+            values = np.ones(len(columns), dtype=np.float32)
+        else:
+            values = (1 + np.log(counts)) * self.idf[columns]
+            values /= max(np.linalg.norm(values), 1e-12)
+        return sparse.csr_matrix((values, (columns, np.zeros(len(columns), dtype=np.int64))),
+                                 shape=(len(self.vocabulary), 1))
+
+    def scores(self, text):
+        """Score of every candidate, in candidate_ids order"""
+        return (self.matrix @ self.query_vector(text)).toarray().ravel()
+
+    def rank(self, text, k=10):
+        """The top k matching candidates for a job description as a DataFrame of candidate_id and score"""
+        scores = self.scores(text)
+        k = min(k, len(scores))
+        if k == 0:
+            return pd.DataFrame({'candidate_id': np.empty(0, dtype=np.int64), 'score': np.empty(0, dtype=np.float32)})
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        # Candidates sharing no term with the query aren't matches
+        top = top[scores[top] > 0]
+        return pd.DataFrame({'candidate_id': self.candidate_ids[top], 'score': scores[top]})
@@ -0,0 +1,73 @@
+import re
+
+from utils.tables import MISSING_VALUE
+
+
+SKILL_SEPARATOR = re.compile(r'\s*(?:,|;|\n|•|➢)\s*')
+
+
+def first(values):
+    return values[0].strip() if values else MISSING_VALUE
+
+
+def split_skills(values):
+    """Individual skills from the Skills entities, which are often whole comma-separated lists"""
+    skills = []
+    for value in values:
+        for skill in SKILL_SEPARATOR.split(value):
+            if skill and skill not in skills:
+                skills.append(skill)
+    return skills
+
+
+def entities_to_record(entities):
+    """
+    A resume record in the nested JSONL schema DataframesFromJSONL reads, from an entity dict
+    of ResumeEntityExtractor ({'Name': [...], 'Email Address': [...], ...}).
+
+    The first entity of a label fills single fields. Companies/designations and colleges/degrees/
+    graduation years are paired up in order, skills go under skills.technical.other. Fields the
+    model doesn't extract are 'Unknown'.
+    """
+    def get(label):
+        return [value for value in entities.get(label, []) if value.strip()]
+
+    companies, designations = get('Companies worked at'), get('Designation')
+    colleges, degrees, years = get('College Name'), get('Degree'), get('Graduation Year')
+
+    return {
+        'personal_info': {
+            'name': first(get('Name')),
+            'email': first(get('Email Address')),
+            'phone': MISSING_VALUE,
+            'location': {
+                'city': first(get('Location')),
+                'country': MISSING_VALUE,
+                'remote_preference': MISSING_VALUE
+            },
+            'summary': MISSING_VALUE,
+            'linkedin': MISSING_VALUE,
+            'github': MISSING_VALUE
+        },
+        'experience': [
+            {
+                'company': first(companies[i:i + 1]),
+                'title': first(designations[i:i + 1]),
+                'dates': {'duration': first(get('Years of Experience')) if i == 0 else MISSING_VALUE}
+            }
+            for i in range(max(len(companies), len(designations)))
+        ],
+        'education': [
+            {
+                'degree': {'level': first(degrees[i:i + 1])},
+                'institution': {'name': first(colleges[i:i + 1])},
+                'dates': {'expected_graduation': first(years[i:i + 1])}
+            }
+            for i in range(max(len(colleges), len(degrees)))
+        ],
+        'skills': {
+            'technical': {
+                'other': [{'name': skill, 'level': MISSING_VALUE} for skill in split_skills(get('Skills'))]
+            }
+        }
+    }
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from utils.documents import extract_text
+from utils.ner import MODEL_PATH
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_text(text):
+    return sha256_bytes(text.encode('utf-8'))
+
+
+def sha256_file(path, block_size=1 << 20):
+    """sha256 of a file's bytes, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def model_version(model_path=MODEL_PATH):
+    """Version string of a trained pipeline from its meta.json, e.g. 'pipeline-0.0.0'"""
+    with open(os.path.join(model_path, 'meta.json'), 'r', encoding='utf-8') as file:
+        meta = json.load(file)
+    return f"{meta.get('name', 'pipeline')}-{meta.get('version', '0.0.0')}"
+
+
+class ResumeResultCache:
+
+    """
+
+    Persistent SQLite cache of extracted resume text and NER entities.
+
+    Texts are keyed by the sha256 of the file bytes, entities by the sha256 of the normalized
+    text, so a re-uploaded resume is served without extraction or spaCy. Entities are stored
+    per model version (from the model's meta.json) and entries from other versions are dropped
+    when the cache is opened. The least recently used entries are evicted once the cache holds
+    more than max_entries texts or max_bytes of data.
+
+    variant tells apart entities extracted differently with the same model, e.g. 'chunked-2000'
+    for ResumeEntityExtractor.extract_chunked as used by service.py and batch.py.
+
+    """
+
+    def __init__(self, path='resume_cache.sqlite', model_path=MODEL_PATH, max_entries=100000, max_bytes=None,
+                 variant=None):
+        self.path = path
+        self.model_path = model_path
+        self.model_version = model_version(model_path) + (f"+{variant}" if variant else '')
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.extractor = None
+
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                file_sha256 TEXT PRIMARY KEY,
+                text_sha256 TEXT NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS texts (
+                text_sha256 TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                entities TEXT,
+                model_version TEXT,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS texts_last_access ON texts (last_access);
+        """)
+        # Entities from another model are stale, the extracted text is still good
+        with self.connection:
+            self.connection.execute(
+                "UPDATE texts SET entities = NULL, model_version = NULL WHERE model_version != ?",
+                (self.model_version,)
+            )
+
+    def get_extractor(self):
+        """The NER extractor, only loaded on the first cache miss"""
+        if self.extractor is None:
+            from utils.ner import ResumeEntityExtractor
+            self.extractor = ResumeEntityExtractor(self.model_path)
+        return self.extractor
+
+    def cached_file_text(self, file_sha256):
+        """Text extracted from the file with these bytes, None if never seen"""
+        row = self.connection.execute(
+            "SELECT text_sha256, texts.text FROM files JOIN texts USING (text_sha256) WHERE files.file_sha256 = ?",
+            (file_sha256,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        # The text is in use too, so it mustn't be the next one evicted
+        with self.connection:
+            self.connection.execute("UPDATE files SET last_access = ? WHERE file_sha256 = ?", (now, file_sha256))
+            self.connection.execute("UPDATE texts SET last_access = ? WHERE text_sha256 = ?", (now, row[0]))
+        return row[1]
+
+    def add_file_text(self, file_sha256, text):
+        """Remember the text extracted from the file with these bytes"""
+        text_sha256 = sha256_text(text)
+        now = time.time()
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO texts (text_sha256, text, size, last_access) VALUES (?, ?, ?, ?)",
+                (text_sha256, text, len(text.encode('utf-8')), now)
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files (file_sha256, text_sha256, last_access) VALUES (?, ?, ?)",
+                (file_sha256, text_sha256, now)
+            )
+        self.evict()
+
+    def file_text(self, path):
+        """Normalized text of a resume file, extracted only if these bytes were never seen"""
+        file_sha256 = sha256_file(path)
+        text = self.cached_file_text(file_sha256)
+        if text is None:
+            text = extract_text(path)
+            self.add_file_text(file_sha256, text)
+        return text
+
+    def cached_entities(self, text_hashes):
+        """{text_sha256: entities} for the hashes cached for the current model"""
+        found = {}
+        hashes = list(set(text_hashes))
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            rows = self.connection.execute(
+                f"SELECT text_sha256, entities FROM texts WHERE model_version = ? "
+                f"AND text_sha256 IN ({', '.join('?' * len(chunk))})",
+                [self.model_version] + chunk
+            )
+            found.update((text_sha256, json.loads(entities)) for text_sha256, entities in rows)
+        return found
+
+    def store_entities(self, items):
+        """Cache (text, entities) pairs for the current model"""
+        now = time.time()
+        rows = []
+        for text, entities in items:
+            entities_json = json.dumps(entities)
+            rows.append((sha256_text(text), text, entities_json, self.model_version,
+                         len(text.encode('utf-8')) + len(entities_json), now))
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO texts (text_sha256, text, entities, model_version, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (text_sha256) DO UPDATE SET entities = excluded.entities, "
+                "model_version = excluded.model_version, size = excluded.size, last_access = excluded.last_access",
+                rows
+            )
+        if rows:
+            self.evict()
+
+    def touch(self, text_hashes):
+        """Mark texts as just used, for the LRU eviction"""
+        now = time.time()
+        with self.connection:
+            self.connection.executemany("UPDATE texts SET last_access = ? WHERE text_sha256 = ?",
+                                        [(now, text_sha256) for text_sha256 in set(text_hashes)])
+
+    def entities(self, texts, batch_size=None, n_process=None, extract=None):
+        """
+        Entity dicts for a list of texts, in order. Only texts missing from the cache are
+        run through the model, in one nlp.pipe stream, or through extract (a function of a
+        list of texts returning their entity dicts) if given.
+        """
+        hashes = [sha256_text(text) for text in texts]
+        found = self.cached_entities(hashes)
+        self.touch(found)
+
+        misses = {}
+        for text_sha256, text in zip(hashes, texts):
+            if text_sha256 not in found:
+                misses.setdefault(text_sha256, text)
+        if misses:
+            if extract is None:
+                extracted = self.get_extractor().extract(misses.values(), batch_size=batch_size, n_process=n_process)
+            else:
+                extracted = extract(list(misses.values()))
+            extracted = list(extracted)
+            for text_sha256, entities in zip(misses, extracted):
+                found[text_sha256] = entities
+            self.store_entities(zip(misses.values(), extracted))
+        return [found[text_sha256] for text_sha256 in hashes]
+
+    def process_files(self, paths, batch_size=None):
+        """(path, text, entities) for resume files, served from the cache where possible"""
+        paths = list(paths)
+        texts = [self.file_text(path) for path in paths]
+        return list(zip(paths, texts, self.entities(texts, batch_size=batch_size)))
+
+    def evict(self):
+        """Drop the least recently used texts (and files pointing at them) beyond the size limits"""
+        count, total = self.connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM texts").fetchone()
+        if (self.max_entries is None or count <= self.max_entries) and (self.max_bytes is None or total <= self.max_bytes):
+            return
+
+        evicted = []
+        rows = self.connection.execute("SELECT text_sha256, size FROM texts ORDER BY last_access")
+        for text_sha256, size in rows:
+            if (self.max_entries is None or count <= self.max_entries) and (self.max_bytes is None or total <= self.max_bytes):
+                break
+            evicted.append((text_sha256,))
+            count -= 1
+            total -= size
+
+        with self.connection:
+            self.connection.executemany("DELETE FROM texts WHERE text_sha256 = ?", evicted)
+            self.connection.executemany("DELETE FROM files WHERE text_sha256 = ?", evicted)
+
+    def close(self):
+        self.connection.close()
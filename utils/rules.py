@@ -0,0 +1,154 @@
+import re
+import time
+
+from spacy.language import Language
+from spacy.scorer import Scorer
+from spacy.training import Example
+from spacy.util import filter_spans
+
+from utils.corpus import iter_corpus
+from utils.ner import MODEL_PATH
+
+
+# Label -> compiled patterns, every match is an entity
+RULE_PATTERNS = {
+    # The training data labels the indeed.com profile link as the Email Address, names can contain a space
+    'Email Address': [
+        re.compile(r'indeed\.com/r/[\w.-]+(?: [\w.-]+)?/ ?[0-9a-f]{6,}'),
+        re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+    ],
+    'Phone': [
+        re.compile(r'(?<![\w+])\+?\d[\d ()-]{8,}\d(?!\w)')
+    ]
+}
+
+# Years in the EDUCATION section that aren't the start of an 'X to Y' range
+EDUCATION_SECTION = re.compile(
+    r'EDUCATION\s(.*?)(?=\s{2}(?:WORK EXPERIENCE|SKILLS|TECHNICAL SKILLS|ADDITIONAL INFORMATION|LINKS|'
+    r'CERTIFICATIONS|AWARDS|PUBLICATIONS|GROUPS|PATENTS)\s|$)',
+    re.DOTALL
+)
+GRADUATION_YEAR = re.compile(r'\b(?:19|20)\d{2}\b(?!\s+to\s)')
+
+# Labels the rules tag by default. On data/train_data.pkl the Graduation Year rule lifts F from 0 to
+# about 0.5, while the Email Address rule scores below the model because only some repeats of the
+# profile link are annotated, so it is opt-in. Phone has no label in nlp_ner_model.
+RULE_LABELS = ('Graduation Year',)
+
+
+def rule_matches(text, labels=RULE_LABELS):
+    """(start, end, label) character offsets of the rule-based entities of a text"""
+    matches = []
+    for label in labels:
+        if label == 'Graduation Year':
+            for section in EDUCATION_SECTION.finditer(text):
+                for match in GRADUATION_YEAR.finditer(text, section.start(1), section.end(1)):
+                    matches.append((match.start(), match.end(), label))
+            continue
+        for pattern in RULE_PATTERNS.get(label, []):
+            for match in pattern.finditer(text):
+                matches.append((match.start(), match.end(), label))
+    return matches
+
+
+@Language.factory('resume_rules', default_config={'labels': list(RULE_LABELS)})
+def create_resume_rules(nlp, name, labels):
+    return ResumeRules(labels)
+
+
+@Language.factory('rule_labels_filter', default_config={'labels': list(RULE_LABELS)})
+def create_rule_labels_filter(nlp, name, labels):
+    return RuleLabelsFilter(labels)
+
+
+class ResumeRules:
+
+    """
+
+    Pipeline component that sets the regex entities before the statistical ner, which keeps
+    them and predicts the rest of the doc around them. The rule spans are also kept in
+    doc.spans['rules'].
+
+    """
+
+    def __init__(self, labels=RULE_LABELS):
+        self.labels = list(labels)
+
+    def __call__(self, doc):
+        spans = []
+        for start, end, label in rule_matches(doc.text, self.labels):
+            span = doc.char_span(start, end, label=label, alignment_mode='expand')
+            if span is not None:
+                spans.append(span)
+        spans = filter_spans(spans)
+        doc.spans['rules'] = spans
+        doc.ents = filter_spans(spans + list(doc.ents))
+        return doc
+
+
+class RuleLabelsFilter:
+
+    """
+
+    Pipeline component after ner that leaves the rule labels to the rules: entities of those
+    labels that the model predicted on its own are dropped.
+
+    """
+
+    def __init__(self, labels=RULE_LABELS):
+        self.labels = set(labels)
+
+    def __call__(self, doc):
+        rules = {(span.start, span.end) for span in doc.spans.get('rules', [])}
+        doc.ents = [ent for ent in doc.ents if ent.label_ not in self.labels or (ent.start, ent.end) in rules]
+        return doc
+
+
+def add_rule_pipes(nlp, labels=RULE_LABELS):
+    """Add the rule pre-pass before ner (and the label filter after it) to a loaded pipeline"""
+    nlp.add_pipe('resume_rules', before='ner', config={'labels': list(labels)})
+    nlp.add_pipe('rule_labels_filter', after='ner', config={'labels': list(labels)})
+    return nlp
+
+
+def benchmark_rules(corpus_path, model_path=MODEL_PATH, labels=RULE_LABELS, batch_size=64, repeat=3):
+    """
+    Throughput (docs/sec, best of repeat runs) and per-label P/R/F of the model alone and of
+    the model with the rule pre-pass, on the gold docs of a .spacy corpus from build_docbin.
+    Use a held-out corpus for accuracy, the shipped model was trained on data/train_data.pkl.
+    """
+    import spacy
+    results = {}
+    for name, with_rules in (('model', False), ('model + rules', True)):
+        nlp = spacy.load(model_path)
+        if with_rules:
+            add_rule_pipes(nlp, labels)
+        references = [example.reference for example in iter_corpus(corpus_path, nlp)]
+        texts = [doc.text for doc in references]
+
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            docs = list(nlp.pipe(texts, batch_size=batch_size))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        examples = [Example(doc, reference) for doc, reference in zip(docs, references)]
+        scores = Scorer.score_spans(examples, 'ents')
+        results[name] = {
+            'docs_per_sec': len(texts) / best,
+            'p': scores['ents_p'],
+            'r': scores['ents_r'],
+            'f': scores['ents_f'],
+            'per_label': scores['ents_per_type']
+        }
+
+    print(f"{'':<22}{'docs/sec':>10}{'P':>8}{'R':>8}{'F':>8}")
+    for name, result in results.items():
+        print(f"{name:<22}{result['docs_per_sec']:>10.1f}{result['p']:>8.3f}{result['r']:>8.3f}{result['f']:>8.3f}")
+    for label in sorted(set().union(*(result['per_label'] for result in results.values()))):
+        row = '  '.join(
+            f"{name} F {results[name]['per_label'].get(label, {}).get('f', 0.0):.3f}" for name in results
+        )
+        print(f"  {label:<22} {row}")
+    return results
@@ -0,0 +1,294 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from utils.tables import MISSING_VALUE
+
+
+# Query field -> (table, column) it indexes, technologies and tools go through the vocabulary
+INDEX_FIELDS = {
+    'skill': ('skills', 'skill_name'),
+    'tech': ('experience_technologies', 'term_id'),
+    'tool': ('experience_tools', 'term_id'),
+    'city': ('candidates', 'city'),
+    'country': ('candidates', 'country'),
+    'remote': ('candidates', 'remote_preference')
+}
+
+# Fields an 'in <place>' filter matches
+LOCATION_FIELDS = ('city', 'country')
+
+QUERY_TOKEN = re.compile(r'\s*(?:(\()|(\))|(,)|((?:\w+:)?"[^"]*")|([^\s(),]+))')
+
+
+def normalize_term(value):
+    return ' '.join(str(value).lower().split())
+
+
+def field_postings(tables, field):
+    """(term, candidate_id) pairs of one index field, without missing values"""
+    table, column = INDEX_FIELDS[field]
+    df = tables[table]
+    values = df[column]
+    if column == 'term_id':
+        values = pd.Series(tables['vocabulary']['term'].to_numpy()[values.to_numpy()], index=df.index)
+    pairs = pd.DataFrame({'value': values.astype(object), 'candidate_id': df['candidate_id'].to_numpy()})
+    pairs = pairs[pairs['value'].notna() & (pairs['value'] != MISSING_VALUE)]
+    return pd.DataFrame({
+        'term': field + ':' + pairs['value'].map(normalize_term),
+        'candidate_id': pairs['candidate_id'].astype(np.int64)
+    })
+
+
+def tokenize_query(query):
+    tokens = []
+    position = 0
+    query = query.strip()
+    while position < len(query):
+        match = QUERY_TOKEN.match(query, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Can't parse query at: {query[position:]}")
+        position = match.end()
+        open_paren, close_paren, comma, quoted, word = match.groups()
+        if open_paren or close_paren:
+            tokens.append(open_paren or close_paren)
+        elif comma:
+            tokens.append('AND')
+        elif quoted:
+            tokens.append(('TERM', quoted.replace('"', '')))
+        elif word.upper() in ('AND', 'OR', 'NOT', 'IN'):
+            tokens.append(word.upper())
+        else:
+            # Sentence punctuation ('London.') isn't part of the term, 'node.js' keeps its dot
+            word = word.rstrip('.;:!?')
+            if word:
+                tokens.append(('TERM', word))
+    return tokens
+
+
+def to_bitmap(ids, size):
+    """Packed bitmap with the bits of ids set"""
+    mask = np.zeros(size, dtype=bool)
+    mask[ids] = True
+    return np.packbits(mask)
+
+
+def bitmap_contains(bitmap, ids):
+    """Boolean mask of the ids whose bit is set"""
+    return ((bitmap[ids >> 3] >> (7 - (ids & 7))) & 1).astype(bool)
+
+
+class CandidateIndex:
+
+    """
+
+    Inverted index from skill, technology, tool, city, country and remote preference to
+    candidate_ids, for boolean queries like 'python AND (django OR flask) in london, remote'.
+
+    Every term is stored as 'field:value' with its posting list, a sorted unique int64 array of
+    candidate_ids, in one concatenated postings array. Terms held by more than 1/64 of the
+    candidates (where a bitmap is smaller than the id array) also get a packed bitmap. Queries
+    combine sparse terms with sorted-array intersections and dense ones with bitwise operations,
+    and the index persists to a single .npz file.
+
+    """
+
+    def __init__(self, terms, offsets, postings, candidate_ids, bitmap_rows, bitmaps):
+        self.terms = terms
+        self.offsets = offsets
+        self.postings = postings
+        self.candidate_ids = candidate_ids
+        self.bitmap_rows = bitmap_rows
+        self.bitmaps = bitmaps
+
+        # Bit positions are candidate_ids
+        self.size = int(candidate_ids[-1]) + 1 if len(candidate_ids) else 0
+        self.all_bitmap = to_bitmap(candidate_ids, self.size)
+
+        # Unqualified values ('london') match the term in any field
+        self.by_value = {}
+        for i, term in enumerate(terms):
+            self.by_value.setdefault(term.split(':', 1)[1], []).append(i)
+
+    @classmethod
+    def from_tables(cls, tables, fields=INDEX_FIELDS):
+        """Build the index from DataframesFromJSONL/ResumeTables tables"""
+        pairs = pd.concat([field_postings(tables, field) for field in fields], ignore_index=True)
+        pairs = pairs.drop_duplicates()
+        codes, terms = pd.factorize(pairs['term'], sort=True)
+        candidate_ids = pairs['candidate_id'].to_numpy()
+
+        # Group the candidate_ids by term, sorted within each term
+        order = np.lexsort((candidate_ids, codes))
+        counts = np.bincount(codes, minlength=len(terms))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        postings = candidate_ids[order]
+
+        all_ids = np.unique(tables['candidates']['candidate_id'].to_numpy().astype(np.int64))
+        size = int(all_ids[-1]) + 1 if len(all_ids) else 0
+        dense = np.flatnonzero(counts * 64 > size)
+        bitmap_rows = np.full(len(terms), -1, dtype=np.int64)
+        bitmap_rows[dense] = np.arange(len(dense))
+        bitmaps = np.zeros((len(dense), (size + 7) // 8), dtype=np.uint8)
+        for row, i in enumerate(dense):
+            bitmaps[row] = to_bitmap(postings[offsets[i]:offsets[i + 1]], size)
+
+        return cls(np.asarray(terms, dtype=str), offsets, postings, all_ids, bitmap_rows, bitmaps)
+
+    def save(self, path):
+        """Write the index to an .npz file"""
+        np.savez(path, terms=self.terms, offsets=self.offsets, postings=self.postings,
+                 candidate_ids=self.candidate_ids, bitmap_rows=self.bitmap_rows, bitmaps=self.bitmaps)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['terms'], data['offsets'], data['postings'], data['candidate_ids'],
+                       data['bitmap_rows'], data['bitmaps'])
+
+    def posting(self, i):
+        """Bitmap of term i if it has one, otherwise its sorted candidate_ids"""
+        if self.bitmap_rows[i] >= 0:
+            return self.bitmaps[self.bitmap_rows[i]]
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def lookup(self, term):
+        """Posting of 'field:value' or, for a bare value, of any field holding it"""
+        term = normalize_term(term)
+        field, _, value = term.partition(':')
+        if value and field in INDEX_FIELDS:
+            i = np.searchsorted(self.terms, term)
+            if i < len(self.terms) and self.terms[i] == term:
+                return self.posting(i)
+            return np.empty(0, dtype=np.int64)
+
+        result = np.empty(0, dtype=np.int64)
+        for i in self.by_value.get(term, []):
+            result = self.union(result, self.posting(i))
+        return result
+
+    # Operands are sorted int64 candidate_id arrays or uint8 packed bitmaps
+
+    def as_bitmap(self, operand):
+        return operand if operand.dtype == np.uint8 else to_bitmap(operand, self.size)
+
+    def intersect(self, a, b):
+        if a.dtype == np.uint8 and b.dtype == np.uint8:
+            return a & b
+        if a.dtype == np.uint8:
+            a, b = b, a
+        if b.dtype == np.uint8:
+            return a[bitmap_contains(b, a)]
+        return np.intersect1d(a, b, assume_unique=True)
+
+    def union(self, a, b):
+        if a.dtype != np.uint8 and b.dtype != np.uint8 and (len(a) + len(b)) * 64 <= self.size:
+            return np.union1d(a, b)
+        return self.as_bitmap(a) | self.as_bitmap(b)
+
+    def complement(self, a):
+        return self.all_bitmap & ~self.as_bitmap(a)
+
+    def operand_size(self, operand):
+        """Rough size for ordering intersections, a bitmap counts as dense"""
+        return self.size if operand.dtype == np.uint8 else len(operand)
+
+    def lookup_location(self, words):
+        """
+        (posting, words used) of an 'in' filter: the longest run of the leading words that is a
+        city or country, or the first word alone if none is
+        """
+        for n in range(len(words), 0, -1):
+            value = normalize_term(' '.join(words[:n]))
+            terms = [f"{field}:{value}" for field in LOCATION_FIELDS]
+            if n == 1 or any(self.terms[i] in terms for i in self.by_value.get(value, [])):
+                result = np.empty(0, dtype=np.int64)
+                for term in terms:
+                    result = self.union(result, self.lookup(term))
+                return result, n
+
+    def search(self, query):
+        """
+        candidate_ids matching a boolean query, sorted.
+
+        Grammar, keywords case-insensitive:
+
+            query    := and_expr ('OR' and_expr)*
+            and_expr := not_expr (['AND' | ','] not_expr)*
+            not_expr := 'NOT' not_expr | 'IN' place | '(' query ')' | term
+            place    := word+ | quoted
+
+        Terms are 'field:value' (fields: skill, tech, tool, city, country, remote) or bare values
+        matched in any field, quoted when they contain spaces ('city:"New York"'). Adjacent
+        terms and commas mean AND. 'in <place>' matches the city or the country, taking as many
+        of the following bare words as name a known place ('in New York'). Trailing . ; : ! ?
+        are dropped from bare words. So 'Python AND (Django OR Flask) in London, remote' means
+        python AND (django OR flask) AND (city:london OR country:london) AND remote.
+        """
+        tokens = tokenize_query(query)
+        result, position = self.parse_or(tokens, 0)
+        if position != len(tokens):
+            raise ValueError(f"Unexpected {tokens[position]!r} in query: {query}")
+        if result.dtype == np.uint8:
+            return np.flatnonzero(np.unpackbits(result, count=self.size))
+        return result
+
+    def parse_or(self, tokens, position):
+        result, position = self.parse_and(tokens, position)
+        while position < len(tokens) and tokens[position] == 'OR':
+            other, position = self.parse_and(tokens, position + 1)
+            result = self.union(result, other)
+        return result, position
+
+    def parse_and(self, tokens, position):
+        operands = []
+        operand, position = self.parse_not(tokens, position)
+        operands.append(operand)
+        while position < len(tokens) and tokens[position] not in ('OR', ')'):
+            if tokens[position] == 'AND':
+                position += 1
+            operand, position = self.parse_not(tokens, position)
+            operands.append(operand)
+
+        # Intersect from the shortest posting list so intermediate results stay small
+        operands.sort(key=self.operand_size)
+        result = operands[0]
+        for operand in operands[1:]:
+            result = self.intersect(result, operand)
+        return result, position
+
+    def parse_not(self, tokens, position):
+        if position < len(tokens) and tokens[position] == 'NOT':
+            operand, position = self.parse_not(tokens, position + 1)
+            return self.complement(operand), position
+        if position < len(tokens) and tokens[position] == 'IN':
+            return self.parse_location(tokens, position + 1)
+        return self.parse_atom(tokens, position)
+
+    def parse_location(self, tokens, position):
+        # A place is made of bare words, 'city:...' terms end it
+        words = []
+        while position + len(words) < len(tokens):
+            token = tokens[position + len(words)]
+            if not isinstance(token, tuple) or ':' in token[1]:
+                break
+            words.append(token[1])
+        if not words:
+            raise ValueError("Query has 'in' without a place")
+        result, used = self.lookup_location(words)
+        return result, position + used
+
+    def parse_atom(self, tokens, position):
+        if position >= len(tokens):
+            raise ValueError("Query ends where a term was expected")
+        token = tokens[position]
+        if token == '(':
+            result, position = self.parse_or(tokens, position + 1)
+            if position >= len(tokens) or tokens[position] != ')':
+                raise ValueError("Missing ) in query")
+            return result, position + 1
+        if isinstance(token, tuple):
+            return self.lookup(token[1]), position + 1
+        raise ValueError(f"Unexpected {token!r} in query")
@@ -0,0 +1,116 @@
+from string import Formatter
+
+import numpy as np
+import pandas as pd
+
+from utils.corpus import build_docbin
+from utils.dedup import UNWANTED_VALUES
+
+
+# The candidate sentence templates of data_exploration.ipynb
+TEMPLATES = [
+    "{name} is a {summary} who lives in {city},{country} and can be reached at email {email} and phone {phone}. {name}'s preference of work is {remote_preference} and {name} can be reached on social media at {linkedin} and {github}.",
+    "Based in {city}, {country}, {name} can be contacted at {email} or {phone}. As someone who is a {summary}, {name} prefers {remote_preference} work arrangements. Connect with {name} on LinkedIn at {linkedin} or view their projects at {github}.",
+    "Meet {name}, a professional living in {city}, {country}. As a {summary}, {name} is available for {remote_preference} opportunities and can be reached via {email}, {phone}, or through social platforms {linkedin} and {github}.",
+    "{name} ({email}) is a {summary} Currently based in {city}, {country}, {name} seeks {remote_preference} work and maintains an active presence on {linkedin} and {github}. Phone contact: {phone}."
+]
+
+# Template field -> NER label of nlp_ner_model/meta.json, other fields are unlabelled context
+FIELD_LABELS = {
+    'name': 'Name',
+    'email': 'Email Address',
+    'city': 'Location',
+    'country': 'Location'
+}
+
+
+def parse_template(template):
+    """[(literal, field), ...] of a template, field is None after the last literal"""
+    return [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+
+
+def is_word_char(text, position):
+    return 0 <= position < len(text) and (text[position].isalnum() or text[position] == '_')
+
+
+def render_template(template, values, lengths, field_labels=FIELD_LABELS, unwanted_values=UNWANTED_VALUES):
+    """
+    Texts and entity offsets for every row of values (a DataFrame of object columns) rendered
+    into template. Texts are built with whole-column concatenation and every field's start offset
+    is a running sum of the literal and value lengths, so no per-row string formatting is needed.
+    An occurrence that runs into a word character on either side isn't labelled, since the
+    tokenizer would not split the word there and the span would snap to the wrong tokens.
+    """
+    n = len(values)
+    texts = pd.Series([''] * n, index=values.index, dtype=object)
+    offset = np.zeros(n, dtype=np.int64)
+    spans = []
+    for literal, field in parse_template(template):
+        texts = texts + literal
+        offset += len(literal)
+        if field is None:
+            continue
+        if field in field_labels:
+            labelled = ~values[field].isin(unwanted_values).to_numpy()
+            spans.append((offset.copy(), offset + lengths[field], field_labels[field], labelled))
+        texts = texts + values[field]
+        offset += lengths[field]
+
+    texts = texts.to_numpy()
+    entities = [[] for _ in range(n)]
+    for starts, ends, label, labelled in spans:
+        for i in np.flatnonzero(labelled):
+            start, end, text = int(starts[i]), int(ends[i]), texts[i]
+            if is_word_char(text, start - 1) or is_word_char(text, end):
+                continue
+            entities[i].append((start, end, label))
+    return texts, entities
+
+
+def generate_training_data(candidates, n=None, templates=TEMPLATES, field_labels=FIELD_LABELS, seed=0):
+    """
+    (text, {'entities': [(start, end, label), ...]}) tuples from candidate rows rendered into
+    randomly chosen templates. With n, n rows are sampled with replacement, otherwise every
+    candidate is used once. Values that are missing or unwanted are rendered but not labelled.
+    """
+    rng = np.random.default_rng(seed)
+    fields = sorted({field for template in templates for _, field in parse_template(template) if field})
+    values = candidates[fields].astype(object).fillna('Unknown').astype(str)
+    if n is not None:
+        values = values.iloc[rng.integers(0, len(values), n)]
+    values = values.reset_index(drop=True)
+    lengths = {field: values[field].str.len().to_numpy() for field in fields}
+
+    choice = rng.integers(0, len(templates), len(values))
+    texts = np.empty(len(values), dtype=object)
+    entities = [None] * len(values)
+    for t, template in enumerate(templates):
+        rows = np.flatnonzero(choice == t)
+        if not len(rows):
+            continue
+        subset = values.iloc[rows]
+        rendered, spans = render_template(template, subset, {field: length[rows] for field, length in lengths.items()},
+                                          field_labels)
+        texts[rows] = rendered
+        for row, row_entities in zip(rows, spans):
+            entities[row] = row_entities
+
+    return [(text, {'entities': row_entities}) for text, row_entities in zip(texts, entities)]
+
+
+def iter_training_data(candidates, n, chunk_size=100000, seed=0, **options):
+    """generate_training_data in chunks of chunk_size, so millions of examples never sit in memory at once"""
+    for chunk, start in enumerate(range(0, n, chunk_size)):
+        yield from generate_training_data(candidates, min(chunk_size, n - start), seed=seed + chunk, **options)
+
+
+def write_training_corpus(candidates, output_path, n=None, shard_size=None, chunk_size=100000, seed=0, **options):
+    """
+    Generate n synthetic examples (default: one per candidate) straight into a .spacy corpus
+    with utils.corpus.build_docbin, ready for nlp.train_model. Returns the build report.
+    """
+    if n is None:
+        train_data = generate_training_data(candidates, seed=seed, **options)
+    else:
+        train_data = iter_training_data(candidates, n, chunk_size, seed, **options)
+    return build_docbin(train_data, output_path, shard_size=shard_size)
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import shutil
+from collections.abc import Mapping
+
+import pandas as pd
+import pyarrow as pa
+
+
+CACHE_FORMAT_VERSION = 4
+
+
+def file_digest(file_path, block_size=1 << 20):
+    """sha256 of a file's content, read in blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_stat(file_path):
+    """(size, mtime_ns) of a file"""
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def dataframe_to_arrow(df):
+    """Convert a DataFrame to an Arrow table, stringifying only the object columns with mixed types"""
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df = df.copy()
+        for col in df.columns:
+            if df[col].dtype != 'object':
+                continue
+            try:
+                pa.array(df[col], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                print(f"Warning: caching mixed-type column {col} as text")
+                df[col] = df[col].map(lambda value: value if value is None else str(value))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def read_arrow_file(path):
+    """Read an Arrow IPC file through a memory map"""
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def write_arrow_file(table, path):
+    """Write an Arrow table as an uncompressed IPC file so it can be memory-mapped"""
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+class LazyTables(Mapping):
+
+    """
+
+    Read-only dict of table name -> DataFrame that loads each table from the cache on first access.
+
+    """
+
+    def __init__(self, cache, table_names):
+        self.cache = cache
+        self.table_names = list(table_names)
+        self.loaded = {}
+
+    def __getitem__(self, name):
+        if name not in self.table_names:
+            raise KeyError(name)
+        if name not in self.loaded:
+            self.loaded[name] = self.cache.read_table(name)
+        return self.loaded[name]
+
+    def __iter__(self):
+        return iter(self.table_names)
+
+    def __len__(self):
+        return len(self.table_names)
+
+    def append(self, new_frames, concat=pd.concat):
+        """Add rows that were just appended to the cache; tables not loaded yet stay lazy"""
+        for name, frame in new_frames.items():
+            if name in self.loaded:
+                self.loaded[name] = concat([self.loaded[name], frame])
+
+
+class TableCache:
+
+    """
+
+    On-disk Arrow cache of the normalized tables built from one JSONL source file.
+
+    The cache is valid while the source has the same size and mtime, or, if those changed,
+    the same sha256 content hash (e.g. after a plain `touch`). Each table is stored as a list of
+    part files so rows parsed from appended lines can be added without rewriting the table.
+
+    """
+
+    def __init__(self, cache_dir, source_path, string_dtype=None):
+        self.cache_dir = cache_dir
+        self.source_path = os.path.abspath(source_path)
+        # pandas dtype for Arrow string columns when reading, None keeps them as object
+        self.string_dtype = string_dtype
+        self.manifest_path = os.path.join(cache_dir, 'manifest.json')
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def read_manifest(self):
+        """Manifest dict, or None if there is no usable cache"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('format_version') != CACHE_FORMAT_VERSION or manifest.get('source') != self.source_path:
+            return None
+        return manifest
+
+    def write_manifest(self, manifest):
+        """Write the manifest atomically, it is what marks the cache as complete"""
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def is_fresh(self, manifest):
+        """Check the manifest against the source file, updating size/mtime after a content-only match"""
+        size, mtime_ns = file_stat(self.source_path)
+        if manifest['size'] == size and manifest['mtime_ns'] == mtime_ns:
+            return True
+        # The content hash is unknown after incremental appends
+        if manifest['size'] == size and manifest.get('sha256') and manifest['sha256'] == file_digest(self.source_path):
+            manifest['mtime_ns'] = mtime_ns
+            self.write_manifest(manifest)
+            return True
+        return False
+
+    def open_tables(self, manifest):
+        """LazyTables over the cached parts described by manifest"""
+        self.manifest = manifest
+        return LazyTables(self, manifest['tables'])
+
+    def table_dir(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def read_table(self, name):
+        """Concatenate the memory-mapped parts of a table into a DataFrame"""
+        parts = [read_arrow_file(os.path.join(self.table_dir(name), part))
+                 for part in self.manifest['tables'][name]]
+        types_mapper = None
+        if self.string_dtype is not None:
+            types_mapper = {pa.string(): self.string_dtype, pa.large_string(): self.string_dtype}.get
+        try:
+            return pa.concat_tables(parts, promote_options='default').to_pandas(types_mapper=types_mapper)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Parts whose column types could not be unified
+            return pd.concat([part.to_pandas(types_mapper=types_mapper) for part in parts], ignore_index=True)
+
+    def write_part(self, name, df):
+        """Write df as the next part file of table name and return the part's file name"""
+        part = f"part-{len(self.manifest['tables'].get(name, [])):05d}.arrow"
+        write_arrow_file(dataframe_to_arrow(df), os.path.join(self.table_dir(name), part))
+        self.manifest['tables'].setdefault(name, []).append(part)
+        return part
+
+    def save(self, dataframes, source_stat, state):
+        """
+        Replace the cache with the given tables.
+
+        source_stat is the (size, mtime_ns) of the source when parsing started and state the
+        parser position (offset, records, tail_sha256) to resume from on the next refresh.
+        """
+        if os.path.exists(self.manifest_path):
+            os.remove(self.manifest_path)
+
+        self.manifest = {
+            'format_version': CACHE_FORMAT_VERSION,
+            'source': self.source_path,
+            'size': source_stat[0],
+            'mtime_ns': source_stat[1],
+            'sha256': file_digest(self.source_path),
+            'tables': {}
+        }
+        self.manifest.update(state)
+        for name, df in dataframes.items():
+            shutil.rmtree(self.table_dir(name), ignore_errors=True)
+            os.makedirs(self.table_dir(name))
+            self.write_part(name, df)
+        self.write_manifest(self.manifest)
+
+    def append(self, new_frames, source_stat, state):
+        """Add one part per table for rows parsed from appended lines and move the manifest forward"""
+        for name, df in new_frames.items():
+            self.write_part(name, df)
+        self.manifest.update(state)
+        self.manifest['size'], self.manifest['mtime_ns'] = source_stat
+        self.manifest['sha256'] = None
+        self.write_manifest(self.manifest)
@@ -0,0 +1,515 @@
+import pandas as pd
+import numpy as np
+import json
+import hashlib
+import importlib.util
+import os
+from itertools import islice
+from utils.dedup import dedup_candidates
+from utils.minhash import near_duplicate_summaries
+from utils.quality import profile_tables, table_completeness
+from utils.aggregates import DashboardAggregates
+
+TABLE_COLUMNS = {
+    'candidates': ['candidate_id', 'name', 'email', 'phone', 'city', 'country',
+                   'remote_preference', 'summary', 'linkedin', 'github'],
+    'experiences': ['experience_id', 'candidate_id', 'company', 'title', 'level', 'employment_type',
+                    'start_date', 'end_date', 'duration', 'industry', 'company_size',
+                    'technologies', 'tools'],
+    'educations': ['candidate_id', 'degree_level', 'field', 'institution',
+                   'institution_location', 'graduation_date', 'gpa'],
+    'skills': ['candidate_id', 'skill_type', 'skill_name', 'skill_level'],
+    
+    # One row per technology/tool of an experience, term_id points into vocabulary
+    'experience_technologies': ['experience_id', 'candidate_id', 'term_id'],
+    'experience_tools': ['experience_id', 'candidate_id', 'term_id'],
+    'vocabulary': ['term_id', 'term']
+}
+
+# Placeholder the source data uses for missing values
+MISSING_VALUE = 'Unknown'
+
+# Low-cardinality columns stored as pandas categoricals when compact=True
+CATEGORICAL_COLUMNS = {
+    'candidates': ['city', 'country', 'remote_preference'],
+    'experiences': ['level', 'employment_type', 'industry', 'company_size'],
+    'educations': ['degree_level'],
+    'skills': ['skill_type', 'skill_name', 'skill_level']
+}
+
+# Arrow-backed strings when pyarrow is installed
+STRING_DTYPE = pd.StringDtype('pyarrow' if importlib.util.find_spec('pyarrow') else 'python')
+
+# Dashboard aggregates file next to the table cache
+AGGREGATES_FILE = 'aggregates.json'
+
+# skills.technical key -> skill_type, 'other' holds skills parsed from resumes without a known type
+SKILL_GROUPS = {
+    'programming_languages': 'programming_language',
+    'frameworks': 'framework',
+    'databases': 'database',
+    'other': 'other'
+}
+
+
+def iter_jsonl_chunks(file_path, chunk_size=10000, offset=0):
+    """
+    Yield (records, end_offset) for chunks of at most chunk_size lines, starting at byte offset.
+    
+    end_offset is the byte position just after the last complete line of the chunk. A trailing
+    line that is still being written (no newline and not valid JSON yet) is left for the next read.
+    """
+    with open(file_path, 'rb') as file:
+        file.seek(offset)
+        while True:
+            lines = list(islice(file, chunk_size))
+            if not lines:
+                break
+            
+            records = []
+            for line in lines:
+                if not line.endswith(b'\n'):
+                    try:
+                        record = json.loads(line) if line.strip() else None
+                    except ValueError:
+                        break
+                else:
+                    record = json.loads(line) if line.strip() else None
+                if record is not None:
+                    records.append(record)
+                offset += len(line)
+            yield records, offset
+
+
+def tail_digest(file_path, offset, window=4096):
+    """sha256 of the bytes just before offset, used to check the file was only appended to"""
+    with open(file_path, 'rb') as file:
+        file.seek(max(0, offset - window))
+        return hashlib.sha256(file.read(offset - max(0, offset - window))).hexdigest()
+
+
+def compact_frame(table, df):
+    """
+    Replace 'Unknown' with real nulls, store the table's CATEGORICAL_COLUMNS as categoricals
+    and the remaining text columns as (Arrow-backed) strings.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if col == 'candidate_id' or df[col].dtype != 'object':
+            continue
+        values = df[col].mask(df[col] == MISSING_VALUE)
+        if col in CATEGORICAL_COLUMNS.get(table, []):
+            df[col] = values.astype('category')
+        else:
+            df[col] = values.astype(STRING_DTYPE)
+    return df
+
+
+def concat_frames(frames):
+    """pd.concat that keeps categorical columns categorical when the categories differ"""
+    result = pd.concat(frames, ignore_index=True)
+    for col in result.columns:
+        if result[col].dtype == 'object' and any(isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames):
+            result[col] = result[col].astype('category')
+    return result
+
+
+def new_table_columns():
+    """Empty column lists for every table"""
+    return {table: {col: [] for col in cols} for table, cols in TABLE_COLUMNS.items()}
+
+
+def gpa_text(gpa):
+    """gpa as text, the source mixes numbers (3.5) and strings ('3.8/4.0') and one column type is cached"""
+    return gpa if gpa is None or isinstance(gpa, str) else str(gpa)
+
+
+def columns_to_frames(columns, compact=False, skip_empty=False):
+    """DataFrames from column lists, compacted if requested. skip_empty leaves out tables without rows"""
+    if skip_empty:
+        columns = {table: cols for table, cols in columns.items() if next(iter(cols.values()))}
+    dataframes = {table: pd.DataFrame(cols) for table, cols in columns.items()}
+    if compact:
+        dataframes = {table: compact_frame(table, df) for table, df in dataframes.items()}
+    return dataframes
+
+
+def append_row(table_columns, row):
+    """Append a row tuple (in TABLE_COLUMNS order) to a table's column lists"""
+    for values, value in zip(table_columns.values(), row):
+        values.append(value)
+
+
+class TableBuilder:
+    
+    """
+    
+    Column lists of every table filled from resume records. candidate_id, experience_id and the
+    technology/tool vocabulary keep counting from the given state, so records can be added in
+    several runs (ResumeTables.refresh, the chunks of batch.py).
+    
+    """
+    
+    def __init__(self, record_count=0, experience_count=0, term_ids=None):
+        self.record_count = record_count
+        self.experience_count = experience_count
+        self.term_ids = {} if term_ids is None else term_ids
+        self.columns = new_table_columns()
+    
+    def frames(self, compact=False, skip_empty=False):
+        """DataFrames of the rows added so far, then start new column lists"""
+        columns, self.columns = self.columns, new_table_columns()
+        return columns_to_frames(columns, compact, skip_empty)
+    
+    def add_record(self, record):
+        """Append the rows of one resume record to the column lists of every table"""
+        columns = self.columns
+        i = self.record_count
+        self.record_count += 1
+        
+        # Main candidate info
+        personal_info = record.get('personal_info', {})
+        location = personal_info.get('location', {})
+        
+        append_row(columns['candidates'], (
+            i,
+            personal_info.get('name', 'Unknown'),
+            personal_info.get('email', 'Unknown'),
+            personal_info.get('phone', 'Unknown'),
+            location.get('city', 'Unknown'),
+            location.get('country', 'Unknown'),
+            location.get('remote_preference', 'Unknown'),
+            personal_info.get('summary', 'Unknown'),
+            personal_info.get('linkedin', 'Unknown'),
+            personal_info.get('github', 'Unknown')
+        ))
+        
+        # Experience data
+        for exp in record.get('experience', []):
+            company_info = exp.get('company_info', {})
+            dates = exp.get('dates', {})
+            tech_env = exp.get('technical_environment', {})
+            technologies = tech_env.get('technologies', [])
+            tools = tech_env.get('tools', [])
+            
+            experience_id = self.experience_count
+            self.experience_count += 1
+            
+            append_row(columns['experiences'], (
+                experience_id,
+                i,
+                exp.get('company', 'Unknown'),
+                exp.get('title', 'Unknown'),
+                exp.get('level', 'Unknown'),
+                exp.get('employment_type', 'Unknown'),
+                dates.get('start', 'Unknown'),
+                dates.get('end', 'Unknown'),
+                dates.get('duration', 'Unknown'),
+                company_info.get('industry', 'Unknown'),
+                company_info.get('size', 'Unknown'),
+                ', '.join(technologies),
+                ', '.join(tools)
+            ))
+            
+            # Exploded technologies/tools with ids into the shared vocabulary
+            for table, terms in (('experience_technologies', technologies), ('experience_tools', tools)):
+                for term in terms:
+                    if term and term != MISSING_VALUE:
+                        append_row(columns[table], (experience_id, i, self.term_id(term)))
+        
+        # Education data
+        for edu in record.get('education', []):
+            degree = edu.get('degree', {})
+            institution = edu.get('institution', {})
+            dates = edu.get('dates', {})
+            achievements = edu.get('achievements', {})
+            
+            append_row(columns['educations'], (
+                i,
+                degree.get('level', 'Unknown'),
+                degree.get('field', 'Unknown'),
+                institution.get('name', 'Unknown'),
+                institution.get('location', 'Unknown'),
+                dates.get('expected_graduation', 'Unknown'),
+                gpa_text(achievements.get('gpa', None))
+            ))
+        
+        # Skills data: programming languages, frameworks and databases
+        technical = record.get('skills', {}).get('technical', {})
+        for group, skill_type in SKILL_GROUPS.items():
+            for skill in technical.get(group, []):
+                if isinstance(skill, dict) and skill.get('name', 'Unknown') != 'Unknown':
+                    append_row(columns['skills'], (
+                        i,
+                        skill_type,
+                        skill.get('name', 'Unknown'),
+                        skill.get('level', 'Unknown')
+                    ))
+    
+    def term_id(self, term):
+        """Id of term in the shared technology/tool vocabulary, adding it if it is new"""
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            term_id = self.term_ids[term] = len(self.term_ids)
+            append_row(self.columns['vocabulary'], (term_id, term))
+        return term_id
+
+
+class ResumeTables:
+    
+    """
+    
+    Normalized candidate/experience/education/skill tables built from a resume JSONL file.
+    Only needs pandas, the plotting layer lives in utils.tools.
+    
+    """
+    
+    def __init__(self, jsonl_file_path, chunk_size=10000, cache_dir=None, compact=False):
+        self.file_path = jsonl_file_path
+        self.chunk_size = chunk_size
+        self.cache_dir = cache_dir
+        
+        # compact=True uses nulls instead of 'Unknown' plus categorical and Arrow string columns
+        self.compact = compact
+        self.cache = None
+        
+        # Position of the last parsed line and number of records parsed so far,
+        # candidate_ids keep counting from here on refresh()
+        self.offset = 0
+        self.record_count = 0
+        self.tail_sha256 = None
+        
+        # Running experience_id and the shared technology/tool vocabulary (term -> term_id)
+        self.experience_count = 0
+        self.term_ids = {}
+        
+        # Data-quality profile and dashboard aggregates, computed on first use and reset by refresh()
+        self.profile = None
+        self.aggregates = None
+        self.df = self.load_dataframes()
+    
+    def load_dataframes(self):
+        """
+        Open the tables from cache_dir if it matches the source file, otherwise parse and cache them.
+        
+        Cached tables are memory-mapped Arrow files and are only read when first accessed. If the
+        source was appended to since it was cached, only the new lines are parsed.
+        """
+        if self.cache_dir is None:
+            return self.create_dataframes()
+        
+        # pyarrow is only needed when caching
+        from utils.table_cache import TableCache
+        
+        self.cache = TableCache(self.mode_cache_dir(), self.file_path, STRING_DTYPE if self.compact else None)
+        manifest = self.cache.read_manifest()
+        if manifest is not None and manifest.get('compact') == self.compact:
+            fresh = self.cache.is_fresh(manifest)
+            if fresh or self.is_appended(manifest['offset'], manifest['tail_sha256']):
+                self.offset = manifest['offset']
+                self.record_count = manifest['records']
+                self.tail_sha256 = manifest['tail_sha256']
+                self.experience_count = manifest['experiences']
+                self.term_ids = None  # read from the cached vocabulary when needed
+                self.df = self.cache.open_tables(manifest)
+                if not fresh:
+                    self.refresh()
+                return self.df
+        
+        source_stat = self.source_stat()
+        dataframes = self.create_dataframes()
+        self.cache.save(dataframes, source_stat, self.parse_state())
+        return dataframes
+    
+    def mode_cache_dir(self):
+        """Cache directory of this mode, compact and plain tables are cached side by side in cache_dir"""
+        return os.path.join(self.cache_dir, 'compact' if self.compact else 'plain')
+    
+    def create_dataframes(self):
+        """
+        Create structured DataFrames from the nested JSON data.
+        
+        Streams the file chunk by chunk and fills all four tables in a single pass,
+        so the raw records are dropped as soon as their rows are extracted.
+        """
+        builder = TableBuilder()
+        self.read_records(builder, 0)
+        return builder.frames(self.compact)
+    
+    def read_records(self, builder, offset):
+        """Parse the file from offset into builder, then take over its running ids and the new offset"""
+        for records, offset in iter_jsonl_chunks(self.file_path, self.chunk_size, offset):
+            for record in records:
+                builder.add_record(record)
+        self.offset = offset
+        self.tail_sha256 = tail_digest(self.file_path, offset)
+        self.record_count = builder.record_count
+        self.experience_count = builder.experience_count
+        self.term_ids = builder.term_ids
+    
+    def parse_state(self):
+        """Where parsing stopped, stored with the cache so a later run can resume from it"""
+        return {
+            'offset': self.offset,
+            'records': self.record_count,
+            'tail_sha256': self.tail_sha256,
+            'experiences': self.experience_count,
+            'compact': self.compact
+        }
+    
+    def is_appended(self, offset, expected_tail):
+        """True if the file still contains the bytes parsed up to offset, i.e. it was only appended to"""
+        return os.path.getsize(self.file_path) >= offset and tail_digest(self.file_path, offset) == expected_tail
+    
+    def refresh(self):
+        """
+        Parse only the lines appended since the last load and append their rows to every table.
+        
+        Existing candidate_ids are kept. Falls back to a full rebuild if the file was rewritten
+        rather than appended to. Returns the number of new records.
+        """
+        self.profile = None
+        self.aggregates = None
+        source_stat = self.source_stat()
+        if not self.is_appended(self.offset, self.tail_sha256):
+            self.df = self.create_dataframes()
+            if self.cache is not None:
+                self.cache.save(self.df, source_stat, self.parse_state())
+            return self.record_count
+        
+        if self.term_ids is None:
+            vocabulary = self.df['vocabulary']
+            self.term_ids = dict(zip(vocabulary['term'], vocabulary['term_id']))
+        
+        first_new_id = self.record_count
+        builder = TableBuilder(self.record_count, self.experience_count, self.term_ids)
+        self.read_records(builder, self.offset)
+        new_frames = builder.frames(self.compact, skip_empty=True)
+        
+        if self.cache is not None:
+            self.cache.append(new_frames, source_stat, self.parse_state())
+        if isinstance(self.df, dict):
+            for table, frame in new_frames.items():
+                self.df[table] = concat_frames([self.df[table], frame])
+        else:
+            self.df.append(new_frames, concat_frames)
+        
+        return self.record_count - first_new_id
+    
+    def quality_profile(self):
+        """
+        Null, 'Unknown' and distinct counts and completeness per column of the four main tables,
+        indexed by (table, column). Computed once and shared by the report and the dashboards.
+        """
+        if self.profile is None:
+            self.profile = profile_tables(self.df, sentinel=MISSING_VALUE)
+        return self.profile
+    
+    def dashboard_aggregates(self, top_n=25):
+        """
+        Top-N value counts per column, summary word-count bins and completeness that the dashboards
+        plot, see utils.aggregates. Built once per data refresh and saved as aggregates.json next to
+        the table cache, so a later run over the same data loads them instead of scanning the tables.
+        """
+        if self.aggregates is not None and self.aggregates.top_n >= top_n:
+            return self.aggregates
+        
+        stamp = self.parse_state()
+        path = os.path.join(self.mode_cache_dir(), AGGREGATES_FILE) if self.cache_dir is not None else None
+        self.aggregates = DashboardAggregates.load(path, stamp) if path is not None else None
+        if self.aggregates is None or self.aggregates.top_n < top_n:
+            self.aggregates = DashboardAggregates.build(self.df, self.quality_profile(), MISSING_VALUE, top_n,
+                                                        self.technology_counts, stamp)
+            if path is not None:
+                self.aggregates.save(path)
+        return self.aggregates
+    
+    def deduplicated_candidates(self, **options):
+        """Candidates after the dedup stage of utils.dedup, returns (candidates, report)"""
+        return dedup_candidates(self.df['candidates'], **options)
+    
+    def near_duplicate_summaries(self, threshold=0.8):
+        """Pairs of candidate_ids with near-identical summaries (MinHash/LSH, see utils.minhash)"""
+        return near_duplicate_summaries(self.df['candidates'], threshold, sentinel=MISSING_VALUE)
+    
+    def search_index(self):
+        """Inverted skill/technology/location index over the tables, see utils.search"""
+        from utils.search import CandidateIndex
+        return CandidateIndex.from_tables(self.df)
+    
+    def ranking_index(self, scoring='bm25'):
+        """BM25/TF-IDF index for ranking candidates against job descriptions, see utils.ranking"""
+        from utils.ranking import RankingIndex
+        return RankingIndex.from_tables(self.df, scoring)
+    
+    def source_stat(self):
+        """(size, mtime_ns) of the source file"""
+        stat = os.stat(self.file_path)
+        return stat.st_size, stat.st_mtime_ns
+    
+    def terms(self, term_ids):
+        """Vocabulary terms for an array of term_ids"""
+        # term_id is the row position in the vocabulary table
+        return self.df['vocabulary']['term'].to_numpy()[np.asarray(term_ids, dtype=np.int64)]
+    
+    def technology_counts(self, table='experience_technologies'):
+        """How often each technology is listed in an experience, most common first (table='experience_tools' for tools)"""
+        counts = self.df[table]['term_id'].value_counts()
+        return pd.Series(counts.to_numpy(), index=self.terms(counts.index), name='count')
+    
+    def technology_cooccurrence(self, table='experience_technologies', top=20):
+        """The top most common pairs of technologies (or tools) listed in the same experience"""
+        links = self.df[table][['experience_id', 'term_id']].drop_duplicates()
+        pairs = links.merge(links, on='experience_id')
+        pairs = pairs[pairs['term_id_x'] < pairs['term_id_y']]
+        counts = pairs.groupby(['term_id_x', 'term_id_y']).size().nlargest(top)
+        return pd.DataFrame({
+            'term_a': self.terms(counts.index.get_level_values(0)),
+            'term_b': self.terms(counts.index.get_level_values(1)),
+            'count': counts.to_numpy()
+        })
+    
+    def candidates_with_technology(self, term, table='experience_technologies'):
+        """candidate_ids with at least one experience listing term"""
+        term_id = self.df['vocabulary'].loc[self.df['vocabulary']['term'] == term, 'term_id']
+        links = self.df[table]
+        return links.loc[links['term_id'].isin(term_id), 'candidate_id'].unique()
+    
+    def export_summary_report(self, output_file='resume_data_summary.txt'):
+        """Export a comprehensive text summary"""
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write("RESUME DATA ANALYSIS REPORT\n")
+            f.write("=" * 50 + "\n\n")
+            
+            f.write(f"Total Resumes Analyzed: {len(self.df['candidates'])}\n\n")
+            
+            # Geographic analysis
+            f.write("GEOGRAPHIC DISTRIBUTION:\n")
+            location_counts = self.df['candidates']['city'].value_counts()
+            for city, count in location_counts.items():
+                f.write(f"  {city}: {count} candidates\n")
+            f.write("\n")
+            
+            # Skills analysis
+            f.write("SKILLS ANALYSIS:\n")
+            if not self.df['skills'].empty:
+                skill_counts = self.df['skills']['skill_name'].value_counts()
+                f.write("Top Skills:\n")
+                for skill, count in skill_counts.head(15).items():
+                    f.write(f"  {skill}: {count} candidates\n")
+            f.write("\n")
+            
+            # Experience analysis
+            f.write("EXPERIENCE ANALYSIS:\n")
+            if not self.df['experiences'].empty:
+                level_counts = self.df['experiences']['level'].value_counts()
+                for level, count in level_counts.items():
+                    f.write(f"  {level}: {count} positions\n")
+            f.write("\n")
+            
+            # Data quality
+            f.write("DATA QUALITY SUMMARY:\n")
+            for table_name, completion_rate in table_completeness(self.quality_profile()).items():
+                f.write(f"  {table_name}: {completion_rate:.1%} data completeness\n")
+        
+        print(f"Summary report exported to: {output_file}")